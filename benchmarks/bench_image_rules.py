@@ -0,0 +1,112 @@
+"""
+Image selection throughput: the old hard-coded select_images logic (three
+regexes compiled per product, a second scan for the fallback) vs the compiled
+rules engine in image_rules.py. Reported as microseconds per 1k candidates.
+
+    python benchmarks/bench_image_rules.py
+"""
+import os
+import re
+import sys
+import timeit
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from image_rules import load_rules
+from image_variants import base_image_key
+
+CANDIDATES_PER_PAGE = [4, 12, 40]
+TOTAL_CANDIDATES = 1000
+REPEAT = 5
+
+
+def legacy_base_name(alt_text):
+    alt_clean = re.sub(r"(?i)\s*by\s+Zara", "", alt_text)
+    alt_clean = re.sub(r"(?i)\s*Image\s*\d+", "", alt_text)
+    alt_clean = alt_clean.strip().replace("-", "").replace(" ", "_")
+    if not alt_clean.endswith("_"):
+        alt_clean += "_"
+    return f"{alt_clean}"
+
+
+def legacy_filename(src):
+    clean_src = src.split("?")[0]
+    return os.path.basename(urlparse(clean_src).path)
+
+
+def legacy_select(candidates):
+    image_links = []
+    image_filenames = set()
+    image_keys = set()
+
+    pattern_alt = re.compile(r"Image\s+\d+", re.IGNORECASE)
+    pattern_ult = re.compile(r"ult\d+\.(jpg|jpeg|png|webp)$", re.IGNORECASE)
+    pattern_e = re.compile(r"e[12]\.(jpg|jpeg|png|webp)$", re.IGNORECASE)
+
+    for src, max_src, alt in candidates:
+        clean_src = src.split("?")[0]
+        if pattern_alt.search(alt) and (pattern_e.search(clean_src) or pattern_ult.search(clean_src)):
+            filename = f"{legacy_base_name(alt)}_{legacy_filename(src)}"
+            if filename not in image_filenames and base_image_key(src) not in image_keys:
+                image_links.append((src, filename, max_src))
+                image_filenames.add(filename)
+                image_keys.add(base_image_key(src))
+
+    if len(image_links) < 2:
+        for src, max_src, alt in candidates:
+            clean_src = src.split("?")[0]
+            if pattern_ult.search(clean_src):
+                file = legacy_filename(src)
+                if file not in image_filenames and base_image_key(src) not in image_keys:
+                    image_links.append((src, file, max_src))
+                    image_filenames.add(file)
+                    image_keys.add(base_image_key(src))
+
+    return image_links
+
+
+def make_page(product, size):
+    """
+    A page's candidates: mostly gallery shots, some ult-only crops without
+    "Image n" alt text, icons and a transparent-background placeholder.
+    """
+    base = f"https://static.zara.net/assets/public/ab12/{product:08d}"
+    candidates = []
+    for i in range(size):
+        kind = i % 4
+        if kind == 0:
+            src = f"{base}-{i:03d}-e1.jpg?ts=1&w=1024"
+            alt = f"RIB KNIT TOP by Zara - Black - Image {i}"
+        elif kind == 1:
+            src = f"{base}-{i:03d}-ult{i}.jpg?ts=1&w=1024"
+            alt = f"RIB KNIT TOP - Black - Image {i}"
+        elif kind == 2:
+            src = f"{base}-{i:03d}-ult{i}.jpg?ts=1&w=1024"
+            alt = "RIB KNIT TOP"
+        else:
+            src = f"https://static.zara.net/stdstatic/{i}/images/transparent-background.png"
+            alt = ""
+        candidates.append((src, src, alt))
+    return candidates
+
+
+def per_1k_us(select, pages):
+    count = sum(len(page) for page in pages)
+    best = min(timeit.repeat(lambda: [select(page) for page in pages], number=1, repeat=REPEAT))
+    return best / count * TOTAL_CANDIDATES * 1e6
+
+
+def main():
+    rules = load_rules(os.path.join(ROOT, "image_rules.json"))
+    print(f"{'per page':>8} {'legacy us/1k':>13} {'rules us/1k':>12} {'speedup':>8}")
+    for size in CANDIDATES_PER_PAGE:
+        pages = [make_page(p, size) for p in range(max(1, 20 * TOTAL_CANDIDATES // size))]
+        legacy = per_1k_us(legacy_select, pages)
+        engine = per_1k_us(rules.select, pages)
+        print(f"{size:>8} {legacy:>13.0f} {engine:>12.0f} {legacy / engine:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
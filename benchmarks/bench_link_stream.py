@@ -0,0 +1,102 @@
+"""
+Peak RSS of scheduling N product links: eager (json.load + one coroutine per URL
+handed to asyncio.gather, as scrape_all used to do) vs streaming (iter_product_links
+feeding a fixed worker pool). Each measurement runs in a fresh subprocess.
+
+    python benchmarks/bench_link_stream.py
+"""
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from link_stream import iter_product_links
+
+LINK_COUNTS = [1000, 10000, 100000, 300000]
+WORKERS = 8
+
+
+def write_links_file(path, count):
+    # Written piece by piece so this parent process stays small: children
+    # forked from it would otherwise start with an inflated ru_maxrss
+    genders, categories = ["man", "woman"], 100
+    per_category = count // (len(genders) * categories)
+    with open(path, "w") as f:
+        f.write("{")
+        for g, gender in enumerate(genders):
+            f.write(f'{"," if g else ""}\n  "{gender}": {{')
+            for c in range(categories):
+                start = (g * categories + c) * per_category
+                urls = [f"https://www.zara.com/in/en/product-name-p{i:08d}.html"
+                        for i in range(start, start + per_category)]
+                f.write(f'{"," if c else ""}\n    "category-{c}": {json.dumps(urls, indent=6)}')
+            f.write("\n  }")
+        f.write("\n}")
+
+
+async def fake_scrape(sem, url):
+    async with sem:
+        await asyncio.sleep(0)
+
+
+async def run_eager(path):
+    with open(path, "r") as f:
+        data = json.load(f)
+    sem = asyncio.Semaphore(WORKERS)
+    tasks = [
+        fake_scrape(sem, url)
+        for cat_map in data.values()
+        for links in cat_map.values()
+        for url in links
+    ]
+    await asyncio.gather(*tasks)
+
+
+async def run_stream(path):
+    sem = asyncio.Semaphore(WORKERS)
+    queue = asyncio.Queue(maxsize=WORKERS * 2)
+
+    async def worker():
+        while (url := await queue.get()) is not None:
+            await fake_scrape(sem, url)
+
+    workers = [asyncio.create_task(worker()) for _ in range(WORKERS)]
+    for _, _, url in iter_product_links(path):
+        await queue.put(url)
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def measure(mode, path):
+    out = subprocess.run(
+        [sys.executable, __file__, mode, path], capture_output=True, text=True, check=True
+    )
+    return float(out.stdout.strip())
+
+
+def main():
+    print(f"{'links':>8} {'eager MB':>10} {'stream MB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in LINK_COUNTS:
+            path = os.path.join(tmp, f"links_{count}.json")
+            write_links_file(path, count)
+            print(f"{count:>8} {measure('eager', path):>10.1f} {measure('stream', path):>10.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        asyncio.run(run_eager(sys.argv[2]) if sys.argv[1] == "eager" else run_stream(sys.argv[2]))
+        print(peak_rss_mb())
+    else:
+        main()
@@ -0,0 +1,138 @@
+import asyncio
+
+try:
+    import psutil  # Optional: enables RSS-based recycling
+except ImportError:
+    psutil = None
+
+MAX_BROWSER_RSS_MB = 2048     # Recycle once Chromium's processes use more than this
+MAX_PAGES_PER_BROWSER = 500   # Recycle after this many pages, whatever the RSS
+HEALTH_CHECK_EVERY = 25       # Pages between RSS measurements
+BROWSER_PROCESS_NAMES = ("chrom", "headless_shell")
+
+
+def browser_rss_mb():
+    """
+    Sums the RSS of the Chromium processes started under this Python process.
+    """
+    if psutil is None:
+        return None
+    total = 0
+    for proc in psutil.Process().children(recursive=True):
+        try:
+            if any(name in proc.name().lower() for name in BROWSER_PROCESS_NAMES):
+                total += proc.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / 1024 / 1024
+
+
+class BrowserSupervisor:
+    """
+    Stands in for a Playwright Browser (new_page/close) and keeps it healthy.
+
+    The browser is relaunched when it crashes or disconnects, after
+    MAX_PAGES_PER_BROWSER pages, or when its RSS passes MAX_BROWSER_RSS_MB.
+    Planned recycles drain: new pages go to the fresh browser while the old
+    one is closed once its last open page is.
+    """
+
+    def __init__(self, playwright, headless=False, max_rss_mb=MAX_BROWSER_RSS_MB, max_pages=MAX_PAGES_PER_BROWSER):
+        self.playwright = playwright
+        self.headless = headless
+        self.max_rss_mb = max_rss_mb
+        self.max_pages = max_pages
+        self.browser = None
+        self.generation = 0
+        self.pages_opened = 0
+        self.crashed = False
+        self.restarts = 0
+        self.active = {}    # generation -> open pages
+        self.retiring = {}  # generation -> old browser waiting for its pages to close
+        self._closing = False
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        if psutil is None and self.max_rss_mb:
+            print("⚠️ psutil is not installed: browsers are recycled by page count only, not by RSS "
+                  "(pip install psutil)")
+        await self._launch()
+        return self
+
+    async def _launch(self):
+        self.browser = await self.playwright.chromium.launch(headless=self.headless)
+        self.generation += 1
+        self.pages_opened = 0
+        self.crashed = False
+        self.active[self.generation] = 0
+        generation = self.generation
+        self.browser.on("disconnected", lambda _: self._on_disconnected(generation))
+
+    def _on_disconnected(self, generation):
+        if generation == self.generation and not self._closing:
+            self.crashed = True
+            print("💥 Browser disconnected; restarting it before the next page")
+
+    def _on_page_closed(self, generation):
+        self.active[generation] -= 1
+        if self.active[generation] == 0 and generation in self.retiring:
+            asyncio.create_task(self._close_quietly(self.retiring.pop(generation)))
+
+    async def _close_quietly(self, browser):
+        try:
+            await browser.close()
+        except Exception:
+            pass
+
+    def _recycle_reason(self):
+        if self.crashed or not self.browser.is_connected():
+            return "crash"
+        if self.pages_opened >= self.max_pages:
+            return f"{self.pages_opened} pages"
+        if self.pages_opened and self.pages_opened % HEALTH_CHECK_EVERY == 0:
+            rss = browser_rss_mb()
+            if rss is not None and rss > self.max_rss_mb:
+                return f"RSS {rss:.0f} MB"
+        return None
+
+    async def _recycle(self, reason):
+        old, old_generation, crashed = self.browser, self.generation, self.crashed
+        print(f"♻️ Restarting browser ({reason})")
+        self.restarts += 1
+        await self._launch()
+        if crashed or self.active[old_generation] == 0:
+            await self._close_quietly(old)
+        else:
+            self.retiring[old_generation] = old
+
+    async def new_page(self):
+        async with self._lock:
+            reason = self._recycle_reason()
+            if reason:
+                await self._recycle(reason)
+            try:
+                page = await self.browser.new_page()
+            except Exception:
+                if self.browser.is_connected():
+                    raise
+                await self._recycle("crash")
+                page = await self.browser.new_page()
+            generation = self.generation
+            self.pages_opened += 1
+            self.active[generation] += 1
+        page.on("close", lambda _: self._on_page_closed(generation))
+        return page
+
+    def lost_since(self, generation):
+        """
+        True if the browser a task started on has crashed or been replaced,
+        meaning its failure was the browser's and it is worth retrying.
+        """
+        return generation != self.generation or self.crashed
+
+    async def close(self):
+        self._closing = True
+        for browser in [self.browser, *self.retiring.values()]:
+            await self._close_quietly(browser)
+        self.retiring.clear()
+        print(f"♻️ Browser restarted {self.restarts} times")
@@ -0,0 +1,257 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from playwright.async_api import async_playwright
+
+import file_writer
+from browser_supervisor import BrowserSupervisor
+from create_categories_json import parse_category_url
+from locales import DEFAULT_LOCALE, LOCALES, locale_file, locale_from_url, store_prefix
+import tracing
+
+CATALOG_FILE = "zara_catalog.json"        # Every discovered category node, keyed by id (l681)
+CATEGORIES_FILE = "zara_categories.json"  # gender → category → URL, as the link stage expects
+NAVIGATION_ENDPOINT = "categories?ajax=true"  # Store navigation JSON behind the menu
+DISCOVERY_TIMEOUT = 15                    # Seconds to wait for the navigation JSON before reading the DOM
+DISCOVERY_CONCURRENCY = 4                 # Pages crawled at once when falling back to the menu DOM
+REFRESH_AFTER_HOURS = 24                  # In DOM mode, unchanged category pages are re-crawled after this long
+
+FETCH_NAVIGATION_JS = """
+url => fetch(url, {headers: {"Accept": "application/json"}, credentials: "include"})
+    .then(r => r.ok ? r.json() : null)
+    .catch(() => null)
+"""
+
+MENU_LINKS_JS = """
+() => Array.from(document.querySelectorAll("a[href]"), a => ({
+    href: a.href,
+    name: (a.textContent || "").trim().replace(/\\s+/g, " "),
+}))
+"""
+
+
+def nodes_from_payload(payload, locale):
+    """
+    Walks the navigation JSON (categories → subcategories, each with an
+    seo keyword and category id) and returns one node per category page.
+    """
+    nodes = []
+
+    def walk(items, parent):
+        for item in items or []:
+            if not isinstance(item, dict):
+                continue
+            seo = item.get("seo") or {}
+            node = None
+            if seo.get("keyword") and seo.get("seoCategoryId"):
+                url = f"{store_prefix(locale)}{seo['keyword']}-l{seo['seoCategoryId']}.html"
+                node = parse_category_url(url, item.get("name") or "", parent)
+            if node:
+                nodes.append(node)
+            walk(item.get("subcategories"), node["id"] if node else parent)
+
+    if isinstance(payload, dict):
+        walk(payload.get("categories"), None)
+    return nodes
+
+
+def nodes_from_anchors(anchors, locale, parent):
+    nodes = {}
+    for anchor in anchors:
+        node = parse_category_url(anchor["href"], anchor["name"], parent)
+        if node and locale_from_url(node["url"]) == locale and node["id"] not in nodes:
+            nodes[node["id"]] = node
+    return list(nodes.values())
+
+
+class Catalog:
+    """
+    Category nodes by id, merged into CATALOG_FILE as they are discovered.
+
+    A node counts as changed when its URL (and so its gender or slug) moves
+    under the same id. Changed and new nodes are collected in `changed`, so
+    later stages refresh only those. Nodes missing from a full navigation
+    payload are kept but marked gone.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.nodes = {}
+        self.seen = set()
+        self.changed = set()  # (gender, category) keys of new or moved nodes
+        self.stats = {"new": 0, "changed": 0, "unchanged": 0, "gone": 0}
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                self.nodes = json.load(f)
+        return self
+
+    def due(self, node):
+        """
+        True when a category page should be crawled for more links (DOM mode).
+        """
+        old = self.nodes.get(node["id"])
+        if old is None or old["url"] != node["url"] or old.get("gone"):
+            return True
+        return time.time() - old.get("crawled_at", 0) > REFRESH_AFTER_HOURS * 3600
+
+    def merge(self, node, source):
+        self.seen.add(node["id"])
+        old = self.nodes.get(node["id"])
+        if old is not None and old["url"] == node["url"] and not old.get("gone"):
+            self.stats["unchanged"] += 1
+            old["name"] = node["name"] or old.get("name", "")
+            old["checked_at"] = time.time()
+        else:
+            self.stats["changed" if old else "new"] += 1
+            self.nodes[node["id"]] = dict(node, source=source, checked_at=time.time())
+            self.changed.add((node["gender"], node["category"]))
+        self.save()
+
+    def mark_crawled(self, node_id):
+        if node_id in self.nodes:
+            self.nodes[node_id]["crawled_at"] = time.time()
+            self.save()
+
+    def retire_unseen(self):
+        for node_id, node in self.nodes.items():
+            if node_id not in self.seen and not node.get("gone"):
+                self.nodes[node_id] = dict(node, gone=True)
+                self.stats["gone"] += 1
+        self.save()
+
+    def save(self):
+        # Nodes are replaced or only have scalar fields touched, so copying one level is enough
+        file_writer.replace_json(self.path, lambda: {k: dict(v) for k, v in self.nodes.items()}, indent=2)
+
+    def categories(self):
+        """
+        gender → category → URL for every live node. If two ids share a slug,
+        the later one is keyed with its id so neither is dropped.
+        """
+        nested = {}
+        for node_id, node in sorted(self.nodes.items(), key=lambda item: int(item[0][1:])):
+            if node.get("gone"):
+                continue
+            cat_map = nested.setdefault(node["gender"], {})
+            key = node["category"] if node["category"] not in cat_map else f"{node['category']}-{node_id}"
+            cat_map[key] = node["url"]
+        return nested
+
+    def report(self, locale):
+        print(f"🧭 {locale}: {self.stats['new']} new, {self.stats['changed']} changed, "
+              f"{self.stats['unchanged']} unchanged, {self.stats['gone']} gone categories")
+
+
+async def fetch_navigation(page, locale):
+    try:
+        with tracing.span("navigation json", locale=locale):
+            return await asyncio.wait_for(
+                page.evaluate(FETCH_NAVIGATION_JS, f"{store_prefix(locale)}{NAVIGATION_ENDPOINT}"),
+                DISCOVERY_TIMEOUT,
+            )
+    except Exception as e:
+        print(f"↩️ No navigation JSON for {locale} ({e or 'timeout'}), reading the menu DOM")
+        return None
+
+
+async def open_page(browser, url):
+    """
+    Opens url and returns its page, or None if it failed to load.
+    """
+    page = await browser.new_page()
+    try:
+        with tracing.span("goto", url=url):
+            await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+        return page
+    except Exception as e:
+        print(f"⚠️ Could not open {url}: {e}")
+        await page.close()
+        return None
+
+
+async def crawl_categories(browser, locale, catalog, nodes):
+    """
+    DOM fallback: visits the category pages that are new, moved or stale and
+    merges the category links found on each, a few pages at a time.
+    """
+    sem = asyncio.Semaphore(DISCOVERY_CONCURRENCY)
+
+    async def visit(node):
+        async with sem:
+            page = await open_page(browser, node["url"])
+            if page is None:
+                return
+            try:
+                anchors = await page.evaluate(MENU_LINKS_JS)
+            finally:
+                await page.close()
+        catalog.mark_crawled(node["id"])
+        for child in nodes_from_anchors(anchors, locale, node["id"]):
+            if child["id"] not in catalog.seen:
+                catalog.merge(child, "dom")
+
+    await asyncio.gather(*(visit(node) for node in nodes))
+
+
+async def discover(browser, locale=DEFAULT_LOCALE, catalog_file=CATALOG_FILE, categories_file=CATEGORIES_FILE):
+    """
+    Discovers a store's categories and merges them into its catalog.
+
+    Reads the navigation JSON the menu is built from; if the store doesn't
+    serve it, falls back to crawling category links out of the menu DOM.
+    Writes the categories file for the link stage and returns the catalog.
+    """
+    catalog = await asyncio.to_thread(Catalog(locale_file(catalog_file, locale)).load)
+    page = await open_page(browser, store_prefix(locale))
+    if page is None:
+        return catalog
+    try:
+        payload = await fetch_navigation(page, locale)
+        nodes = nodes_from_payload(payload, locale)
+        anchors = [] if nodes else await page.evaluate(MENU_LINKS_JS)
+    finally:
+        await page.close()
+
+    if nodes:
+        for node in nodes:
+            catalog.merge(node, "xhr")
+        catalog.retire_unseen()
+    else:
+        nodes = nodes_from_anchors(anchors, locale, None)
+        due = [node for node in nodes if catalog.due(node)]
+        for node in nodes:
+            catalog.merge(node, "dom")
+        await crawl_categories(browser, locale, catalog, due)
+
+    categories = catalog.categories()
+    file_writer.replace_json(locale_file(categories_file, locale), lambda: categories, indent=4)
+    catalog.report(locale)
+    return catalog
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Discover Zara store categories into zara_categories.json.")
+    parser.add_argument("--locales", nargs="+", default=LOCALES,
+                        help="Stores to crawl as <country>/<language>, e.g. in/en es/en")
+    parser.add_argument("--headless", action="store_true")
+    return parser.parse_args()
+
+
+async def main(locales=LOCALES, headless=False):
+    file_writer.enable()
+    try:
+        async with async_playwright() as p:
+            browser = await BrowserSupervisor(p, headless=headless).start()
+            await asyncio.gather(*(discover(browser, locale) for locale in locales))
+            await browser.close()
+    finally:
+        await file_writer.finish()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    asyncio.run(main(args.locales, args.headless))
@@ -1,14 +1,40 @@
 import json
 import re
 
+from locales import DEFAULT_LOCALE, locale_file, locale_from_url, localize_url
+
+# <store>/<gender>-<category slug>-l<id>.html, e.g. in/en/man-knitwear-l681.html
+CATEGORY_URL_PATTERN = re.compile(r"zara\.com/([a-z]{2}/[a-z]{2})/([a-z0-9]+(?:-[a-z0-9]+)*)-l(\d+)\.html")
+
+def parse_category_url(url, name="", parent=None):
+    """
+    Parses a category URL into a catalog node: id (l681), gender (man),
+    category (knitwear) and the canonical URL without query string.
+    Returns None for non-category URLs and top-level section pages (woman-l1000).
+    """
+    match = CATEGORY_URL_PATTERN.search(url)
+    if not match:
+        return None
+    locale, slug, number = match.groups()
+    gender, _, category = slug.partition("-")
+    if not category:
+        return None
+    return {
+        "id": f"l{number}",
+        "gender": gender,
+        "category": category,
+        "name": name,
+        "url": f"https://www.zara.com/{locale}/{slug}-l{number}.html",
+        "parent": parent,
+    }
+
 def extract_keys(url):
     """
     Extracts the top-level key (kid/man/woman) and subcategory (e.g., girl-tshirts) from the URL.
     """
-    match = re.search(r"zara\.com/.+?/([a-z]+)-([a-z]+-[a-z]+)", url)
-    if match:
-        top_level, sub_category = match.groups()
-        return top_level, sub_category
+    node = parse_category_url(url)
+    if node:
+        return node["gender"], node["category"]
     return None, None
 
 def build_nested_dict(urls):
@@ -23,14 +49,27 @@ def build_nested_dict(urls):
             nested_dict[top_level][sub_category] = url
     return nested_dict
 
-if __name__ == "__main__":
-    with open("zara_urls.txt", "r") as file:
+def urls_for_locale(urls, locale=DEFAULT_LOCALE):
+    """
+    Keeps the category URLs of one store. A store with none of its own borrows
+    the default store's categories, pointed at its locale.
+    """
+    own = [url for url in urls if locale_from_url(url) == locale]
+    if own:
+        return own
+    return [localize_url(url, locale) for url in urls if locale_from_url(url) == DEFAULT_LOCALE]
+
+def read_urls(path="zara_urls.txt"):
+    with open(path, "r") as file:
         content = file.read()
-        urls = [url.strip() for url in content.split(",") if url.strip()]
+        return [url.strip() for url in content.split(",") if url.strip()]
+
+if __name__ == "__main__":
+    urls = read_urls()
 
-    result = build_nested_dict(urls)
+    result = build_nested_dict(urls_for_locale(urls))
 
-    with open("zara_categories.json", "w") as f:
+    with open(locale_file("zara_categories.json"), "w") as f:
         json.dump(result, f, indent=4)
 
-    print("Saved as zara_categories.json")
\ No newline at end of file
+    print(f"Saved as {locale_file('zara_categories.json')}")
\ No newline at end of file
@@ -0,0 +1,278 @@
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import tracing
+
+WRITE_QUEUE_SIZE = 256   # Pending writes before producers wait; bounds memory held by image bodies
+DEBOUNCE_SECONDS = 2.0   # State files are rewritten at most once per window
+
+writer = None  # Set by enable(); while None, writes run inline on the caller's thread
+
+
+class FileWriter:
+    """
+    Runs filesystem writes on one background thread, so the event loop never
+    blocks on disk.
+
+    One-off writes (image bodies, snapshots, hardlinks) go through a bounded
+    queue in order; when it is full, async producers wait off the loop, and
+    sync callers (timers, index flushes) park the write in an overflow list
+    that a helper thread feeds into the queue, so the loop never blocks.
+    Image bodies and hardlinks are awaited until written (run()), so nothing
+    is indexed as saved unless the write succeeded.
+    State files are debounced: repeated updates within DEBOUNCE_SECONDS
+    collapse into a single atomic replace (temp file + os.replace) with the
+    latest contents. Directories are created once per folder.
+    """
+
+    def __init__(self, queue_size=WRITE_QUEUE_SIZE, debounce=DEBOUNCE_SECONDS):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.overflow = deque()  # Posts waiting for room in the queue, oldest first
+        self.overflow_lock = threading.Lock()
+        self.drainer = None      # Thread moving overflow into the queue, while there is any
+        self.debounce = debounce
+        self.folders = set()  # Directories known to exist (writer thread only)
+        self.dirty = {}       # key -> callable run at the end of the window, loop thread only
+        self.timer = None
+        self.thread = threading.Thread(target=self._run, name="file-writer", daemon=True)
+        self.stats = {"writes": 0, "replaces": 0, "coalesced": 0, "errors": 0,
+                      "max_depth": 0, "latency_total": 0.0, "latency_max": 0.0}
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def depth(self):
+        return self.queue.qsize() + len(self.overflow)
+
+    def _try_put(self, item):
+        """
+        Queues item if nothing is waiting ahead of it and there is room.
+        """
+        with self.overflow_lock:
+            if self.overflow:
+                return False
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                return False
+        self.stats["max_depth"] = max(self.stats["max_depth"], self.depth())
+        return True
+
+    def post(self, fn, *args):
+        """
+        Queues fn(*args) for the writer thread without ever blocking. When the
+        queue is full, the write waits in the overflow list, still in order.
+        Returns a Future for fn's result, for callers that need to know it ran.
+        """
+        item = (fn, args, time.monotonic(), Future())
+        if self._try_put(item):
+            return item[3]
+        with self.overflow_lock:
+            self.overflow.append(item)
+            if self.drainer is None:
+                self.drainer = threading.Thread(target=self._drain, name="file-writer-overflow", daemon=True)
+                self.drainer.start()
+        self.stats["max_depth"] = max(self.stats["max_depth"], self.depth())
+        return item[3]
+
+    async def submit(self, fn, *args):
+        """
+        Like post(), but waits (off the loop) for room in the queue instead of
+        growing the overflow list; use it for large payloads such as image bodies.
+        """
+        item = (fn, args, time.monotonic(), Future())
+        if not self._try_put(item):
+            await asyncio.to_thread(self._put_waiting, item)
+        return item[3]
+
+    async def run(self, fn, *args):
+        """
+        Like submit(), but waits until fn has run and returns its result, or
+        raises its error, so callers record only writes that succeeded.
+        """
+        return await asyncio.wrap_future(await self.submit(fn, *args))
+
+    def _put_waiting(self, item):
+        while not self._try_put(item):
+            time.sleep(0.01)  # Let the overflow drain first, so posted writes keep their order
+
+    def _drain(self):
+        while True:
+            with self.overflow_lock:
+                if not self.overflow:
+                    self.drainer = None
+                    return
+                item = self.overflow[0]
+            self.queue.put(item)  # Blocks this helper thread, never the loop
+            with self.overflow_lock:
+                self.overflow.popleft()
+
+    def schedule(self, key, fn):
+        """
+        Runs fn() on the loop thread at the end of the current debounce
+        window; later calls with the same key replace earlier ones.
+        """
+        if key in self.dirty:
+            self.stats["coalesced"] += 1
+        self.dirty[key] = fn
+        if self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.debounce, self.flush)
+
+    def replace_json(self, path, contents, **dump_kwargs):
+        """
+        Schedules an atomic rewrite of path. contents() is called once per
+        debounce window, on the loop thread, and must return a snapshot the
+        caller will not mutate afterwards.
+        """
+        self.schedule(path, lambda: self.post(replace_file, path, contents(), dump_kwargs, self.folders))
+
+    def flush(self):
+        """
+        Runs every pending debounced update now.
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        dirty, self.dirty = self.dirty, {}
+        for fn in dirty.values():
+            fn()
+
+    def makedirs(self, folder):
+        self.post(makedirs_cached, folder, self.folders)
+
+    async def close(self):
+        self.flush()
+        await asyncio.to_thread(self._stop)
+        self.report()
+
+    def _stop(self):
+        while True:
+            with self.overflow_lock:
+                drainer = self.drainer
+            if drainer is None:
+                break
+            drainer.join()
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            fn, args, queued_at, future = item
+            begin = tracing.now()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"🚫 Write failed ({fn.__name__}): {e}")
+                future.set_exception(e)
+            tracing.record(fn.__name__, begin)
+            latency = time.monotonic() - queued_at
+            self.stats["replaces" if fn is replace_file else "writes"] += 1
+            self.stats["latency_total"] += latency
+            self.stats["latency_max"] = max(self.stats["latency_max"], latency)
+
+    def report(self):
+        done = self.stats["writes"] + self.stats["replaces"]
+        average = self.stats["latency_total"] / done if done else 0
+        print(f"💾 Writer: {self.stats['writes']} writes, {self.stats['replaces']} state file replaces "
+              f"({self.stats['coalesced']} updates coalesced), {self.stats['errors']} errors; "
+              f"max queue depth {self.stats['max_depth']}, flush latency avg {average * 1000:.1f} ms, "
+              f"max {self.stats['latency_max'] * 1000:.1f} ms")
+
+
+def makedirs_cached(folder, folders):
+    if folder and folder not in folders:
+        os.makedirs(folder, exist_ok=True)
+        folders.add(folder)
+
+
+def write_file(path, data, folders):
+    makedirs_cached(os.path.dirname(path), folders)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def replace_file(path, data, dump_kwargs, folders):
+    makedirs_cached(os.path.dirname(path), folders)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, **dump_kwargs)
+    os.replace(tmp, path)
+
+
+def enable(queue_size=WRITE_QUEUE_SIZE, debounce=DEBOUNCE_SECONDS):
+    global writer
+    writer = FileWriter(queue_size, debounce).start()
+    return writer
+
+
+async def finish():
+    """
+    Flushes pending state files, waits for queued writes and reports stats.
+    """
+    global writer
+    if writer is not None:
+        writer.flush()  # Debounced updates still post to the thread, not inline
+        current, writer = writer, None
+        await current.close()
+
+
+async def write_bytes(path, data):
+    """
+    Writes data to path and returns once it is on disk; raises if the write failed.
+    """
+    if writer is None:
+        write_file(path, data, set())
+    else:
+        await writer.run(write_file, path, data, writer.folders)
+
+
+def post(fn, *args):
+    if writer is None:
+        fn(*args)
+    else:
+        writer.post(fn, *args)
+
+
+async def submit(fn, *args):
+    if writer is None:
+        fn(*args)
+    else:
+        await writer.submit(fn, *args)
+
+
+async def run(fn, *args):
+    if writer is None:
+        return fn(*args)
+    return await writer.run(fn, *args)
+
+
+def makedirs(folder):
+    if writer is None:
+        os.makedirs(folder, exist_ok=True)
+    else:
+        writer.makedirs(folder)
+
+
+def schedule(key, fn):
+    if writer is None:
+        fn()
+    else:
+        writer.schedule(key, fn)
+
+
+def replace_json(path, contents, **dump_kwargs):
+    if writer is None:
+        replace_file(path, contents(), dump_kwargs, set())
+    else:
+        writer.replace_json(path, contents, **dump_kwargs)
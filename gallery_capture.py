@@ -0,0 +1,153 @@
+import asyncio
+
+from image_variants import TARGET_WIDTH
+
+CAPTURE_TIMEOUT = 10  # Seconds to wait for the gallery JSON before falling back to the DOM
+REFERENCE_KEYS = ("reference", "displayReference")  # Product JSON fields carrying the id from the page URL
+STATIC_HOST = "https://static.zara.net/photos//"
+
+
+def xmedia_url(item, width):
+    """
+    The CDN URL for an xmedia entry at the given width (in the path, /w/<width>/).
+    """
+    if item.get("url"):
+        return item["url"].replace("{width}", str(width))
+    if item.get("path") and item.get("name"):
+        url = f"{STATIC_HOST}{item['path'].strip('/')}/w/{width}/{item['name']}.jpg"
+        if item.get("timestamp"):
+            url += f"?ts={item['timestamp']}"
+        return url
+    return None
+
+
+def xmedia_to_image(item, alt):
+    """
+    Builds a DOM-like image record ({src, srcset, alt}) from one xmedia entry.
+
+    The srcset offers TARGET_WIDTH and the full width, so select_variant()
+    picks the same size as on the DOM path and can still report the savings.
+    """
+    max_width = item.get("width") or 1920
+    max_url = xmedia_url(item, max_width)
+    if max_url is None:
+        return None
+    srcset = f"{max_url} {max_width}w"
+    if max_width > TARGET_WIDTH:
+        srcset = f"{xmedia_url(item, TARGET_WIDTH)} {TARGET_WIDTH}w, {srcset}"
+    return {"src": xmedia_url(item, min(TARGET_WIDTH, max_width)), "srcset": srcset, "alt": alt}
+
+
+def extract_gallery_images(payload, product_name=""):
+    """
+    Walks a product JSON payload and returns every xmedia image in it.
+
+    Alt text mirrors the storefront's "<name> - Image <n>" so the images go
+    through the same selection and naming rules as the DOM path.
+    """
+    images = []
+
+    def walk(node, name):
+        if isinstance(node, dict):
+            label = node.get("name") if isinstance(node.get("name"), str) else None
+            if label and "xmedia" in node:  # colour entry
+                name = f"{name} - {label}" if name else label
+            elif label and ("detail" in node or node.get("datatype") == "product"):
+                name = label
+            for item in node.get("xmedia") or []:
+                if isinstance(item, dict) and item.get("type", "image") == "image":
+                    image = xmedia_to_image(item, f"{name} - Image {len(images) + 1}")
+                    if image:
+                        images.append(image)
+            for key, value in node.items():
+                if key != "xmedia":
+                    walk(value, name)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value, name)
+
+    walk(payload, product_name)
+    return images
+
+
+def matches_product(node, product_id):
+    """
+    True when a product node's reference (e.g., "05639123-800" or
+    "5639/123/800") starts with the product id from the page URL.
+    """
+    detail = node.get("detail")
+    for owner in (node, detail if isinstance(detail, dict) else {}):
+        for key in REFERENCE_KEYS:
+            digits = "".join(c for c in str(owner.get(key) or "") if c.isdigit())
+            if digits and digits.lstrip("0").startswith(product_id.lstrip("0")):
+                return True
+    return False
+
+
+def find_product(payload, product_id):
+    """
+    Returns the first node of payload describing product_id, or None.
+    """
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if matches_product(node, product_id):
+                return node
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return None
+
+
+class GalleryCapture:
+    """
+    Listens to a page's responses and resolves as soon as a JSON payload
+    carrying the product gallery (xmedia entries) arrives.
+
+    With a product_id, only that product's images are taken: the whole
+    payload if the response URL names the product, otherwise the matching
+    product node, so galleries of related products on the page are ignored.
+    """
+
+    def __init__(self, page, product_id=None):
+        self.page = page
+        self.product_id = product_id
+        self.parsing = set()  # Parse tasks in flight; referenced here so they aren't collected mid-await
+        self.captured = asyncio.get_running_loop().create_future()
+        page.on("response", self._on_response)
+
+    def _on_response(self, response):
+        if self.captured.done():
+            return
+        if response.request.resource_type not in ("xhr", "fetch"):
+            return
+        if "json" not in response.headers.get("content-type", ""):
+            return
+        task = asyncio.create_task(self._parse(response))
+        self.parsing.add(task)
+        task.add_done_callback(self.parsing.discard)
+
+    async def _parse(self, response):
+        try:
+            payload = await response.json()
+        except Exception:
+            return
+        if self.product_id and self.product_id not in response.url:
+            payload = find_product(payload, self.product_id)
+        images = extract_gallery_images(payload) if payload is not None else []
+        if images and not self.captured.done():
+            self.captured.set_result(images)
+
+    async def wait(self, timeout=CAPTURE_TIMEOUT):
+        """
+        Returns the captured images, or [] if nothing arrived in time.
+        """
+        try:
+            return await asyncio.wait_for(asyncio.shield(self.captured), timeout)
+        except asyncio.TimeoutError:
+            return []
+        finally:
+            self.page.remove_listener("response", self._on_response)
+            for task in self.parsing:
+                task.cancel()
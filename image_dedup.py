@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from image_index import IMAGES_ROOT
+
+INDEX_FILE = "dedup_index.npz"
+REPORT_FILE = "dedup_report.json"
+THRESHOLD = 6        # Max Hamming distance (of 64 bits) for two images to count as duplicates
+MAX_BLOCK = 2048     # Rows and columns compared at once inside one bucket (tiles of MAX_BLOCK²)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def dhash(path):
+    """
+    64-bit difference hash: sign of horizontal gradients on a 9x8 grayscale thumbnail.
+    Returns None for files Pillow cannot read.
+    """
+    try:
+        with Image.open(path) as img:
+            pixels = np.asarray(img.convert("L").resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    except Exception:
+        return None
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def popcount(values):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return POPCOUNT[values.view(np.uint8)].reshape(values.shape + (8,)).sum(axis=-1)
+
+
+def scan_images(root):
+    found = {}
+    for folder, _, files in os.walk(root):
+        for name in files:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(folder, name)
+                stat = os.stat(path)
+                found[path] = (stat.st_size, stat.st_mtime)
+    return found
+
+
+class HashIndex:
+    """
+    NumPy-backed perceptual-hash index persisted to INDEX_FILE.
+
+    Rows are keyed by path and stamped with size and mtime, so a refresh only
+    hashes files that are new or changed since the last run.
+    """
+
+    def __init__(self, index_file=INDEX_FILE):
+        self.index_file = index_file
+        self.paths = np.array([], dtype=str)
+        self.hashes = np.array([], dtype=np.uint64)
+        self.sizes = np.array([], dtype=np.int64)
+        self.mtimes = np.array([], dtype=np.float64)
+
+    def load(self):
+        if os.path.exists(self.index_file):
+            data = np.load(self.index_file)
+            self.paths, self.hashes = data["paths"], data["hashes"]
+            self.sizes, self.mtimes = data["sizes"], data["mtimes"]
+        return self
+
+    def save(self):
+        np.savez(self.index_file, paths=self.paths, hashes=self.hashes, sizes=self.sizes, mtimes=self.mtimes)
+
+    def refresh(self, root, workers=None):
+        on_disk = scan_images(root)
+        known = {
+            path: i for i, path in enumerate(self.paths.tolist())
+            if on_disk.get(path) == (self.sizes[i], self.mtimes[i])
+        }
+        new_paths = [path for path in on_disk if path not in known]
+        print(f"🧮 {len(known)} hashes reused, hashing {len(new_paths)} new or changed images")
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            new_hashes = list(pool.map(dhash, new_paths, chunksize=64))
+
+        keep = np.array(sorted(known.values()), dtype=np.int64)
+        hashed = [(p, h) for p, h in zip(new_paths, new_hashes) if h is not None]
+        self.paths = np.concatenate([self.paths[keep], np.array([p for p, _ in hashed], dtype=str)])
+        self.hashes = np.concatenate([self.hashes[keep], np.array([h for _, h in hashed], dtype=np.uint64)])
+        self.sizes = np.array([on_disk[p][0] for p in self.paths.tolist()], dtype=np.int64)
+        self.mtimes = np.array([on_disk[p][1] for p in self.paths.tolist()], dtype=np.float64)
+        return self
+
+    def restamp(self, paths):
+        position = {path: i for i, path in enumerate(self.paths.tolist())}
+        for path in paths:
+            stat = os.stat(path)
+            self.sizes[position[path]], self.mtimes[position[path]] = stat.st_size, stat.st_mtime
+
+
+def band_masks(threshold):
+    """
+    Splits the 64 bits into threshold + 1 bands. By pigeonhole, two hashes
+    within the threshold agree exactly on at least one band.
+    """
+    bands = threshold + 1
+    widths = [64 // bands + (1 if i < 64 % bands else 0) for i in range(bands)]
+    shift = 0
+    for width in widths:
+        yield shift, np.uint64((1 << width) - 1)
+        shift += width
+
+
+def near_pairs(hashes, threshold=THRESHOLD):
+    """
+    Returns (i, j) index pairs whose Hamming distance is at most threshold.
+    Only hashes sharing a band value are compared, block-wise with NumPy.
+    """
+    pairs = set()
+    for shift, mask in band_masks(threshold):
+        keys = (hashes >> np.uint64(shift)) & mask
+        order = np.argsort(keys, kind="stable")
+        boundaries = np.flatnonzero(np.diff(keys[order])) + 1
+        for bucket in np.split(order, boundaries):
+            if len(bucket) < 2:
+                continue
+            bucket_hashes = hashes[bucket]
+            for row_start in range(0, len(bucket), MAX_BLOCK):
+                block = bucket_hashes[row_start:row_start + MAX_BLOCK, None]
+                # Only the upper triangle: each row block against itself and later
+                # column blocks, so temporaries stay MAX_BLOCK x MAX_BLOCK
+                for col_start in range(row_start, len(bucket), MAX_BLOCK):
+                    distances = popcount(block ^ bucket_hashes[None, col_start:col_start + MAX_BLOCK])
+                    rows, cols = np.nonzero(distances <= threshold)
+                    rows += row_start
+                    cols += col_start
+                    upper = cols > rows
+                    pairs.update(zip(bucket[rows[upper]].tolist(), bucket[cols[upper]].tolist()))
+    return pairs
+
+
+def clusters_from_pairs(pairs):
+    parent = {}
+
+    def find(x):
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in pairs:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+
+    groups = {}
+    for x in parent:
+        groups.setdefault(find(x), []).append(x)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def stars(members, hashes, sizes, threshold):
+    """
+    Splits a union-find cluster, whose links may chain far beyond the
+    threshold, into stars: the largest remaining image is kept and only
+    members within threshold of that image are its duplicates. Returns
+    (keep, duplicates) pairs; members near nothing but the chain are left out.
+    """
+    remaining = sorted(members, key=lambda i: -sizes[i])
+    result = []
+    while len(remaining) > 1:
+        keep, rest = remaining[0], np.array(remaining[1:])
+        near = popcount(hashes[rest] ^ hashes[keep]) <= threshold
+        if near.any():
+            result.append((keep, rest[near].tolist()))
+        remaining = rest[~near].tolist()
+    return result
+
+
+def hardlink(keep, duplicate):
+    if os.path.samefile(keep, duplicate):
+        return False
+    tmp = duplicate + ".dedup"
+    os.link(keep, tmp)
+    os.replace(tmp, duplicate)
+    return True
+
+
+def dedup(root=IMAGES_ROOT, threshold=THRESHOLD, collapse=False, workers=None):
+    index = HashIndex().load().refresh(root, workers)
+    clusters = clusters_from_pairs(near_pairs(index.hashes, threshold))
+
+    report = {}
+    linked = []
+    for members in clusters:
+        # Keep the largest file of each star, usually the highest resolution
+        for keep_id, duplicate_ids in stars(members, index.hashes, index.sizes, threshold):
+            keep = index.paths[keep_id]
+            duplicates = [index.paths[i] for i in duplicate_ids]
+            in_star = {keep_id, *duplicate_ids}
+            # Chained to this star through other images but beyond threshold of keep: listed, never linked
+            transitive = [index.paths[i] for i in members if i not in in_star]
+            report[keep] = {"duplicates": duplicates, "transitive": transitive}
+            if collapse:
+                linked.extend(d for d in duplicates if hardlink(keep, d))
+
+    if linked:
+        index.restamp(linked)
+    index.save()
+    with open(REPORT_FILE, "w") as f:
+        json.dump(report, f, indent=2)
+
+    duplicates = sum(len(entry["duplicates"]) for entry in report.values())
+    print(f"🧬 {len(index.paths)} images, {len(clusters)} clusters, {duplicates} near-duplicates "
+          f"(threshold {threshold}) → {REPORT_FILE}")
+    if collapse:
+        print(f"🔗 Hardlinked {len(linked)} duplicates to their cluster's kept image")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Find near-duplicate images by perceptual hash.")
+    parser.add_argument("--root", default=IMAGES_ROOT)
+    parser.add_argument("--threshold", type=int, default=THRESHOLD)
+    parser.add_argument("--hardlink", action="store_true",
+                        help="Replace duplicates with hardlinks to the kept image")
+    parser.add_argument("--workers", type=int, default=None)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    dedup(args.root, args.threshold, args.hardlink, args.workers)
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import re
+import shutil
+
+import file_writer
+from seen_store import RecordStore, SeenSet
+
+IMAGES_ROOT = "zara_images"
+MANIFEST_FILE = "image_manifest.json"  # Legacy JSON manifest, migrated into MANIFEST_STORE
+MANIFEST_STORE = "image_manifest"      # image_manifest.db: product id -> folder and filenames
+FILES_INDEX = "image_files"  # image_files.db + image_files.bloom: every saved image, as folder/filename
+
+PRODUCT_ID_PATTERN = re.compile(r"-p(\d+)\.html")
+
+
+def extract_product_id(url):
+    """
+    Extracts the product id (e.g., 05639123) from a product URL.
+    """
+    match = PRODUCT_ID_PATTERN.search(url)
+    return match.group(1) if match else None
+
+
+def file_key(folder, filename):
+    return f"{os.path.normpath(folder)}/{filename}"
+
+
+def link_or_copy(source, target):
+    try:
+        os.link(source, target)
+    except OSError:  # Filesystem without hardlinks
+        shutil.copy2(source, target)
+
+
+class ImageIndex:
+    """
+    Index of the images already saved under IMAGES_ROOT.
+
+    Filenames live in a persistent SeenSet, so per-file existence checks are
+    bloom-filter lookups and startup doesn't depend on how many images exist.
+    The tree is only walked (with os.scandir) the first time, or on rescan.
+    The manifest (a RecordStore, one row per product) remembers which
+    filenames each product produced and where, which lets finished products
+    be skipped before their page is opened, and products seen in another
+    store be linked instead of fetched.
+    """
+
+    def __init__(self, root=IMAGES_ROOT, manifest_store=MANIFEST_STORE, files_index=FILES_INDEX,
+                 manifest_file=MANIFEST_FILE):
+        self.root = root
+        self.manifest_file = manifest_file
+        self.files = SeenSet(files_index)  # folder/filename of every image on disk
+        self.folders = set()  # Folders known to exist
+        self.manifest = RecordStore(manifest_store)  # product id -> {"folder": where it was saved, "files": filenames}
+        self.in_flight = set()  # (product id, folder) currently being scraped
+
+    def build(self, rescan=False):
+        self.files.open()
+        if rescan:
+            self.files.clear()
+        if not len(self.files) and os.path.isdir(self.root):
+            self._scan(self.root)
+            self.files.commit()
+        self.manifest.open()
+        if os.path.exists(self.manifest_file):
+            self._migrate_manifest()
+        print(f"🗂️ Indexed {len(self.files)} images, {len(self.manifest)} products in manifest")
+        return self
+
+    def _migrate_manifest(self):
+        with open(self.manifest_file, "r") as f:
+            entries = json.load(f)
+        for product_id, entry in entries.items():
+            if isinstance(entry, list):  # Older manifests stored only the list of filenames
+                entry = {"folder": None, "files": entry}
+            self.manifest.put(product_id, entry)
+        self.manifest.commit()
+        os.replace(self.manifest_file, f"{self.manifest_file}.migrated")
+        print(f"📦 Migrated {len(entries)} products from {self.manifest_file} to {self.manifest.path}.db")
+
+    def _scan(self, folder):
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    self._scan(entry.path)
+                elif entry.is_file():
+                    self.files.add(file_key(folder, entry.name))
+        self.folders.add(os.path.normpath(folder))
+
+    def ensure_folder(self, folder):
+        """
+        Creates the folder (on the writer thread) on first use only; later
+        calls are a dict lookup.
+        """
+        key = os.path.normpath(folder)
+        if key not in self.folders:
+            file_writer.makedirs(folder)
+            self.folders.add(key)
+
+    def has(self, folder, filename):
+        return file_key(folder, filename) in self.files
+
+    def add(self, folder, filename):
+        self.ensure_folder(folder)
+        self.files.add(file_key(folder, filename))
+        self.files.save()
+
+    def _complete_in(self, entry, folder):
+        return bool(entry["files"]) and all(self.has(folder, name) for name in entry["files"])
+
+    def is_complete(self, url, folder):
+        """
+        True when every image recorded for this product is already in the folder.
+        """
+        entry = self.manifest.get(extract_product_id(url))
+        return entry is not None and self._complete_in(entry, folder)
+
+    async def reuse(self, url, folder):
+        """
+        Links a product's images into folder when the same product id was
+        already downloaded elsewhere (e.g., from another store). Returns the
+        number of images reused, or 0 if the product still needs scraping
+        (including when a link failed; the ones that worked stay indexed).
+        """
+        entry = self.manifest.get(extract_product_id(url))
+        source = entry and entry["folder"]
+        if not source or os.path.normpath(source) == os.path.normpath(folder) or not self._complete_in(entry, source):
+            return 0
+        self.ensure_folder(folder)
+        missing = [name for name in entry["files"] if not self.has(folder, name)]
+        results = await asyncio.gather(
+            *(file_writer.run(link_or_copy, os.path.join(source, name), os.path.join(folder, name)) for name in missing),
+            return_exceptions=True,
+        )
+        failed = 0
+        for name, result in zip(missing, results):
+            if isinstance(result, Exception):
+                print(f"🚫 Could not link {name} into {folder}: {result}")
+                failed += 1
+            else:
+                self.add(folder, name)
+        return 0 if failed else len(entry["files"])
+
+    def claim(self, url, folder):
+        """
+        Marks a product as being scraped into folder. False if another worker
+        already is (e.g., the same product reached through another store).
+        """
+        key = (extract_product_id(url) or url, os.path.normpath(folder))
+        if key in self.in_flight:
+            return False
+        self.in_flight.add(key)
+        return True
+
+    def release(self, url, folder):
+        self.in_flight.discard((extract_product_id(url) or url, os.path.normpath(folder)))
+
+    def record_product(self, url, filenames, folder):
+        product_id = extract_product_id(url)
+        if product_id:
+            self.manifest.put(product_id, {"folder": os.path.normpath(folder), "files": list(filenames)})
+
+    def close(self):
+        """
+        Call once the writer thread has finished.
+        """
+        self.files.close()
+        self.manifest.close()
+
+    def save_manifest(self):
+        # Debounced; only the products recorded since the last flush are written
+        self.manifest.save()
@@ -0,0 +1,125 @@
+import json
+import os
+import re
+from functools import lru_cache
+
+from image_variants import base_image_key
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "image_rules.json")  # Shipped config, not run output
+
+
+def file_name(src):
+    return src.split("?", 1)[0].rsplit("/", 1)[-1]
+
+
+def compile_rule(patterns):
+    """
+    One case-insensitive regex for a pattern or list of patterns (None if empty).
+    """
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+
+class Tier:
+    """
+    One priority level of selection: optional regexes for the alt text and the
+    image file name, plus the template used to name matching files ({base}
+    from the alt text, {file} from the URL).
+    """
+
+    __slots__ = ("name", "alt", "file", "filename", "needs_base")
+
+    def __init__(self, spec):
+        self.name = spec["name"]
+        self.alt = compile_rule(spec.get("alt"))
+        self.file = compile_rule(spec.get("file"))
+        self.filename = spec.get("filename", "{file}")
+        self.needs_base = "{base}" in self.filename
+
+
+class ImageRules:
+    """
+    Compiled image selection rules, loaded from image_rules.json.
+
+    Candidates are classified in a single pass into the first tier they match.
+    Tiers are then taken in priority order: the first always, each later one
+    only while fewer than min_images have been selected.
+    """
+
+    def __init__(self, config):
+        self.exclude = compile_rule(config.get("exclude"))
+        self.base_strip = [compile_rule(p) for p in config.get("base_name_strip", [])]
+        self.min_images = config.get("min_images", 0)
+        self.tiers = [Tier(spec) for spec in config["tiers"]]
+        # Bound search methods per tier, so classify() makes no attribute lookups
+        self.matchers = [
+            (tier.file.search if tier.file else None, tier.alt.search if tier.alt else None)
+            for tier in self.tiers
+        ]
+
+    def base_name(self, alt_text):
+        alt_clean = alt_text
+        for pattern in self.base_strip:  # Applied in order, each on the previous result
+            alt_clean = pattern.sub("", alt_clean)
+        alt_clean = alt_clean.strip().replace("-", "").replace(" ", "_")
+        if not alt_clean.endswith("_"):
+            alt_clean += "_"
+        return alt_clean
+
+    def excludes(self, src):
+        """
+        True when the URL's file name matches an exclude pattern.
+        """
+        return bool(self.exclude and self.exclude.search(file_name(src)))
+
+    def classify(self, candidates):
+        """
+        Buckets (src, max_src, alt) candidates by the first tier they match,
+        as (src, max_src, alt, file). Excluded file names are dropped.
+        """
+        buckets = [[] for _ in self.tiers]
+        matchers = list(zip(buckets, self.matchers))
+        excluded = self.exclude.search if self.exclude else None
+        for src, max_src, alt in candidates:
+            file = file_name(src)
+            if excluded and excluded(file):
+                continue
+            for bucket, (file_matches, alt_matches) in matchers:
+                if (file_matches is None or file_matches(file)) and (alt_matches is None or alt_matches(alt)):
+                    bucket.append((src, max_src, alt, file))
+                    break
+        return buckets
+
+    def select(self, candidates):
+        """
+        Returns (src, filename, max_src, tier name) for the images to download,
+        deduplicated by filename and by underlying image.
+        """
+        selected = []
+        filenames = set()
+        keys = set()
+        for position, (tier, bucket) in enumerate(zip(self.tiers, self.classify(candidates))):
+            if position and len(selected) >= self.min_images:
+                break
+            for src, max_src, alt, file in bucket:
+                filename = tier.filename.format(base=self.base_name(alt) if tier.needs_base else "", file=file)
+                key = base_image_key(src)
+                if filename in filenames or key in keys:
+                    continue
+                selected.append((src, filename, max_src, tier.name))
+                filenames.add(filename)
+                keys.add(key)
+        return selected
+
+
+@lru_cache(maxsize=None)
+def load_rules(path=RULES_FILE):
+    """
+    Loads and compiles the rules once per process. Call it at startup, so a
+    missing or invalid config fails before any page is rendered.
+    """
+    with open(path, "r") as f:
+        return ImageRules(json.load(f))
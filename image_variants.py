@@ -0,0 +1,81 @@
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+TARGET_WIDTH = 1024  # Smallest width we accept for training images
+WIDTH_PARAM = "w"    # Query parameter the static.zara.net CDN resizes on
+
+
+def width_from_url(url):
+    """
+    Returns the CDN width query parameter (e.g., ?w=563) as an int, if present.
+    """
+    for key, value in parse_qsl(urlparse(url).query):
+        if key == WIDTH_PARAM and value.isdigit():
+            return int(value)
+    return None
+
+
+def with_width(url, width):
+    """
+    Rewrites (or adds) the CDN width query parameter.
+    """
+    parts = urlparse(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k != WIDTH_PARAM]
+    query.append((WIDTH_PARAM, str(width)))
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+
+def base_image_key(url):
+    """
+    Identifies the underlying image regardless of the size it was requested at.
+    """
+    return url.split("?")[0]
+
+
+def parse_srcset(srcset):
+    """
+    Parses a srcset attribute into (url, width) pairs.
+
+    Width comes from the "563w" descriptor, else from the CDN query parameter;
+    it is None when neither is available (e.g., "2x" density descriptors).
+    """
+    variants = []
+    if not srcset:
+        return variants
+    for entry in srcset.split(","):
+        parts = entry.strip().split()
+        if not parts:
+            continue
+        url = parts[0]
+        width = None
+        if len(parts) > 1 and parts[1].endswith("w") and parts[1][:-1].isdigit():
+            width = int(parts[1][:-1])
+        if width is None:
+            width = width_from_url(url)
+        variants.append((url, width))
+    return variants
+
+
+def select_variant(variants, target_width=TARGET_WIDTH):
+    """
+    Picks the smallest variant at least target_width wide.
+
+    Returns (url, max_url): the chosen URL and the max-resolution one, which is
+    only used to report how many bytes the choice saved.
+    """
+    sized = [(w, url) for url, w in variants if w]
+    if not sized:
+        url = variants[0][0]
+        # No advertised sizes: ask the CDN for the target width directly
+        if width_from_url(url) is not None:
+            return with_width(url, target_width), url
+        return url, url
+
+    sized.sort()
+    max_url = sized[-1][1]
+    for width, url in sized:
+        if width >= target_width:
+            return url, max_url
+    # Nothing advertised is wide enough; a resizable CDN URL can be asked for it
+    if width_from_url(max_url) is not None:
+        return with_width(max_url, target_width), max_url
+    return max_url, max_url
@@ -0,0 +1,51 @@
+from locales import DEFAULT_LOCALE, store_prefix
+
+LINK_QUOTA = 200        # Default number of product links kept per category
+CATEGORY_QUOTAS = {}    # Per-category overrides, e.g. {"new-in": 400}
+SCROLL_LIMIT = 1000000
+SCROLL_STEP = 1000
+QUOTA_CHECK_EVERY = 50  # Scroll steps between in-page link counts
+
+# Filters, strips "?...", dedups and caps inside the page, returning a ready list
+HARVEST_LINKS_JS = """
+([prefix, quota]) => {
+    const seen = new Set();
+    for (const a of document.querySelectorAll("a[href*='p0']")) {
+        const href = a.getAttribute("href");
+        if (!href || !href.startsWith(prefix)) continue;
+        seen.add(href.split("?")[0]);
+        if (seen.size >= quota) break;
+    }
+    return Array.from(seen);
+}
+"""
+
+COUNT_LINKS_JS = """
+([prefix, quota]) => {
+    const seen = new Set();
+    for (const a of document.querySelectorAll("a[href*='p0']")) {
+        const href = a.getAttribute("href");
+        if (href && href.startsWith(prefix)) seen.add(href.split("?")[0]);
+        if (seen.size >= quota) break;
+    }
+    return seen.size;
+}
+"""
+
+
+def quota_for(category):
+    return CATEGORY_QUOTAS.get(category, LINK_QUOTA)
+
+
+async def scroll_until_quota(page, quota, prefix=store_prefix(DEFAULT_LOCALE)):
+    """
+    Scrolls the category page, stopping early once the quota of links is loaded.
+    """
+    for step, y in enumerate(range(0, SCROLL_LIMIT, SCROLL_STEP), start=1):
+        await page.evaluate(f"window.scrollTo(0, {y})")
+        if step % QUOTA_CHECK_EVERY == 0 and await page.evaluate(COUNT_LINKS_JS, [prefix, quota]) >= quota:
+            return
+
+
+async def harvest_links(page, quota, prefix=store_prefix(DEFAULT_LOCALE)):
+    return await page.evaluate(HARVEST_LINKS_JS, [prefix, quota])
@@ -0,0 +1,155 @@
+import json
+import re
+
+CHUNK_SIZE = 65536
+CATEGORY_CHUNK_SIZE = 8192  # Smaller reads: one reader per category may be active at once
+
+WHITESPACE = re.compile(rb"\s*")
+STRING = re.compile(rb'"(?:[^"\\]|\\.)*"')
+SCALAR = re.compile(rb"[^\s,\]}]+(?=[\s,\]}])")
+
+
+def _events(f, chunk_size):
+    """
+    Incremental JSON tokenizer over a binary file.
+
+    Yields (event, value, offset) with event one of "key", "string", "open"
+    and "close"; offset is the byte position of the token in the file.
+    """
+    stack = []
+    expect_key = False
+    buf, pos, base = b"", 0, f.tell()
+
+    def more():
+        nonlocal buf, pos, base
+        chunk = f.read(chunk_size)
+        base += pos
+        buf, pos = buf[pos:] + chunk, 0
+        return bool(chunk)
+
+    while True:
+        pos = WHITESPACE.match(buf, pos).end()
+        if pos >= len(buf):
+            if not more():
+                return
+            continue
+
+        ch = buf[pos:pos + 1]
+        if ch == b'"':
+            match = STRING.match(buf, pos)
+            if not match:
+                if not more():
+                    raise ValueError("Unterminated string")
+                continue
+            value = json.loads(match.group())
+            offset = base + pos
+            pos = match.end()
+            if expect_key:
+                expect_key = False
+                yield "key", value, offset
+            else:
+                yield "string", value, offset
+        elif ch in (b"{", b"["):
+            stack.append(ch)
+            expect_key = ch == b"{"
+            yield "open", ch, base + pos
+            pos += 1
+        elif ch in (b"}", b"]"):
+            stack.pop()
+            yield "close", ch, base + pos
+            pos += 1
+        elif ch == b",":
+            expect_key = stack[-1] == b"{"
+            pos += 1
+        elif ch == b":":
+            pos += 1
+        else:
+            # Numbers, true/false/null: skipped, but must not be split across chunks
+            match = SCALAR.match(buf, pos)
+            if not match:
+                if not more():
+                    return
+                continue
+            pos = match.end()
+
+
+class _ReopeningReader:
+    """
+    Minimal file for _events() that opens the file only for each read, so
+    any number of paused category streams hold no file descriptors.
+    """
+
+    def __init__(self, path, offset):
+        self.path = path
+        self.offset = offset
+
+    def tell(self):
+        return self.offset
+
+    def read(self, size):
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(size)
+        self.offset += len(data)
+        return data
+
+
+def _walk(path, chunk_size):
+    """
+    Yields (gender, category, event, value, offset) for tokens inside the
+    {gender: {category: [...]}} layout of zara_product_links.json.
+    """
+    keys = []
+    with open(path, "rb") as f:
+        for event, value, offset in _events(f, chunk_size):
+            if event == "key":
+                keys[-1] = value
+            elif event == "open":
+                if len(keys) == 2:
+                    yield keys[0], keys[1], event, value, offset
+                keys.append(None)
+            elif event == "close":
+                keys.pop()
+            elif len(keys) == 3:
+                yield keys[0], keys[1], event, value, offset
+
+
+def iter_product_links(path, chunk_size=CHUNK_SIZE):
+    """
+    Streams (gender, category, url) triples out of zara_product_links.json.
+
+    The file is parsed incrementally in fixed-size chunks, so memory stays flat
+    no matter how many links it holds.
+    """
+    for gender, category, event, value, _ in _walk(path, chunk_size):
+        if event == "string":
+            yield gender, category, value
+
+
+def index_categories(path, chunk_size=CHUNK_SIZE):
+    """
+    One streaming pass that returns (gender, category, offset) for every
+    category list, so each list can later be read on its own.
+    """
+    return [
+        (gender, category, offset)
+        for gender, category, event, value, offset in _walk(path, chunk_size)
+        if event == "open" and value == b"["
+    ]
+
+
+def iter_category_links(path, offset, chunk_size=CATEGORY_CHUNK_SIZE):
+    """
+    Lazily yields the URLs of the one category list starting at offset.
+    Between chunks only the offset and unparsed tail are kept, not an open file.
+    """
+    depth = 0
+    for event, value, _ in _events(_ReopeningReader(path, offset), chunk_size):
+        if event == "open":
+            depth += 1
+        elif event == "close":
+            depth -= 1
+            if depth == 0:
+                return
+        elif event == "string" and depth == 1:
+            yield value
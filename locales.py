@@ -0,0 +1,35 @@
+import os
+import re
+
+DEFAULT_LOCALE = "in/en"
+LOCALES = [DEFAULT_LOCALE]  # Stores to crawl, as "<country>/<language>", e.g. ["in/en", "es/en", "us/en"]
+
+LOCALE_PATTERN = re.compile(r"zara\.com/([a-z]{2}/[a-z]{2})/")
+
+
+def store_prefix(locale=DEFAULT_LOCALE):
+    return f"https://www.zara.com/{locale}/"
+
+
+def locale_from_url(url):
+    match = LOCALE_PATTERN.search(url)
+    return match.group(1) if match else None
+
+
+def localize_url(url, locale):
+    """
+    Points a store URL at another locale, e.g. /in/en/... → /es/en/...
+    """
+    return LOCALE_PATTERN.sub(f"zara.com/{locale}/", url, count=1)
+
+
+def locale_file(path, locale=DEFAULT_LOCALE):
+    """
+    Per-locale name for a progress/output file. The default locale keeps the
+    original name (zara_product_links.json), others get a suffix
+    (zara_product_links.es-en.json), so each store resumes independently.
+    """
+    if locale == DEFAULT_LOCALE:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{locale.replace('/', '-')}{ext}"
@@ -0,0 +1,200 @@
+import argparse
+import asyncio
+import json
+import time
+from playwright.async_api import async_playwright
+
+import category_discovery
+import create_categories_json
+import file_writer
+import scrape_zara_categories as link_stage
+import speed_scrap as image_stage
+from browser_supervisor import BrowserSupervisor
+from image_index import ImageIndex
+from image_rules import load_rules
+from locales import LOCALES, locale_file
+from scheduler import FairScheduler
+import tracing
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Run categories → links → images as one streaming pipeline in a shared browser."
+    )
+    parser.add_argument("--urls-file", default=None,
+                        help="Build categories from a hand-maintained URL list instead of discovering them")
+    parser.add_argument("--catalog-file", default=category_discovery.CATALOG_FILE)
+    parser.add_argument("--categories-file", default="zara_categories.json")
+    parser.add_argument("--links-file", default="zara_product_links.json")
+    parser.add_argument("--locales", nargs="+", default=LOCALES,
+                        help="Stores to crawl as <country>/<language>, e.g. in/en es/en")
+    parser.add_argument("--no-categories", dest="categories", action="store_false",
+                        help="Reuse the existing categories file instead of rebuilding it")
+    parser.add_argument("--no-links", dest="links", action="store_false",
+                        help="Reuse the existing links file instead of scraping category pages")
+    parser.add_argument("--no-images", dest="images", action="store_false",
+                        help="Stop after collecting product links")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="Ignore saved links and the scraped log and start from scratch")
+    parser.add_argument("--rescan", action="store_true",
+                        help="Rebuild the image file index from disk (after deleting or moving images by hand)")
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--deadline", type=float, default=None, metavar="MINUTES",
+                        help="Stop dispatching product pages after this long, favouring category coverage")
+    parser.add_argument("--trace", nargs="?", const=tracing.TRACE_FILE, default=None,
+                        help="Record per-URL spans as a Chrome trace-event JSON file")
+    parser.add_argument("--profile", nargs="?", const=tracing.PROFILE_FILE, default=None,
+                        help="With --trace, also sample Python stacks into a collapsed-stack file")
+    return parser.parse_args()
+
+
+async def run_categories(args, browser, locale):
+    """
+    Returns the store's categories and the (gender, category) keys that are
+    new or moved since the last discovery, whose saved links are stale.
+    """
+    categories_file = locale_file(args.categories_file, locale)
+    if not args.categories:
+        with open(categories_file, "r") as f:
+            return json.load(f), set()
+
+    if args.urls_file:
+        urls = create_categories_json.read_urls(args.urls_file)
+        categories = create_categories_json.build_nested_dict(create_categories_json.urls_for_locale(urls, locale))
+        file_writer.replace_json(categories_file, lambda: categories, indent=4)
+        print(f"🗂️ Saved {sum(len(c) for c in categories.values())} categories to {categories_file}")
+        return categories, set()
+
+    catalog = await category_discovery.discover(browser, locale, args.catalog_file, args.categories_file)
+    return catalog.categories(), catalog.changed
+
+
+def feed_links(scheduler, arrived, gender, category, links):
+    if scheduler is None:
+        return
+    scheduler.add((gender, category), links)
+    arrived.set()
+
+
+async def dispatch(scheduler, arrived, queue, links_task):
+    """
+    Moves URLs from the fair scheduler into the bounded work queue as soon as
+    any category yields links, until the links stage is done or time is up.
+    """
+    while True:
+        item = scheduler.next()
+        if item is not None:
+            (gender, category), url = item
+            await queue.put((url, image_stage.image_folder(gender, category), tracing.now()))
+            continue
+        if links_task.done() or scheduler.expired():
+            return
+        arrived.clear()
+        try:
+            await asyncio.wait_for(arrived.wait(), timeout=1)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_links(args, browser, sem, locale, scheduler, arrived):
+    categories, changed = await run_categories(args, browser, locale)
+    links_file = locale_file(args.links_file, locale)
+    if args.resume or not args.links:
+        results = link_stage.load_results(categories, links_file)
+    else:
+        results = {gender: {} for gender in categories}
+    if args.links:
+        for gender, category in changed:
+            results[gender].pop(category, None)  # New or moved category: re-scrape its links
+
+    if not args.links:
+        for gender, cat_map in results.items():
+            for category, links in cat_map.items():
+                feed_links(scheduler, arrived, gender, category, links)
+        return
+
+    async def category_links(gender, category, url):
+        links = results[gender].get(category)
+        if links:
+            print(f"⏭️ Skipping {locale} {gender} → {category} (already processed)")
+        else:
+            _, _, links = await link_stage.scrape_links_from_category(
+                sem, url, gender, category, browser, links_file, results, locale
+            )
+        # Product renders start as soon as this category yields links
+        feed_links(scheduler, arrived, gender, category, links)
+
+    await asyncio.gather(*(
+        category_links(gender, category, url)
+        for gender, cat_map in categories.items()
+        for category, url in cat_map.items()
+    ))
+
+
+async def main():
+    args = parse_args()
+    if args.trace:
+        tracing.enable(args.trace, args.profile)
+    file_writer.enable()
+    try:
+        await run(args)
+    finally:
+        await file_writer.finish()  # Writer thread records spans, so it stops before the tracer
+        tracing.finish()
+
+
+async def run(args):
+    started = time.monotonic()
+    if args.images:
+        load_rules()  # Fail on a bad image_rules.json before any browser work
+
+    async with async_playwright() as p:
+        browser = await BrowserSupervisor(p, headless=args.headless).start()
+        scheduler = None
+        if args.images:
+            scraped_log = await asyncio.to_thread(image_stage.load_scraped_log, args.locales, args.resume)
+            scheduler = FairScheduler.with_budget(args.deadline * 60 if args.deadline else None,
+                                                  skip=scraped_log.__contains__)
+        arrived = asyncio.Event()
+
+        # Stores share the browser and the link-stage concurrency limit
+        link_sem = asyncio.Semaphore(link_stage.CONCURRENT_TASKS)
+        links_task = asyncio.ensure_future(asyncio.gather(
+            *(run_links(args, browser, link_sem, locale, scheduler, arrived) for locale in args.locales)
+        ))
+        links_task.add_done_callback(lambda _: arrived.set())
+
+        if args.images:
+            index = await asyncio.to_thread(ImageIndex(image_stage.IMAGES_DIR).build, args.rescan)
+            sem = asyncio.Semaphore(image_stage.CONCURRENT_TASKS)
+            queue = asyncio.Queue(maxsize=image_stage.CONCURRENT_TASKS * 2)
+            workers = [
+                asyncio.create_task(image_stage.image_worker(queue, sem, browser, scraped_log, index))
+                for _ in range(image_stage.CONCURRENT_TASKS)
+            ]
+
+            await dispatch(scheduler, arrived, queue, links_task)
+            if scheduler.expired():
+                print("⏰ Deadline reached; finishing in-flight pages")
+                links_task.cancel()
+            for _ in workers:
+                await queue.put(image_stage.DONE)
+            await asyncio.gather(*workers)
+            await image_stage.finish_run(scraped_log, index)
+            scheduler.report()
+
+        try:
+            await links_task
+        except asyncio.CancelledError:
+            pass
+
+        await browser.close()
+
+    first_saved_at = image_stage.download_stats["first_saved_at"]
+    if first_saved_at is not None:
+        print(f"⏱️ Time to first image: {first_saved_at - started:.1f}s")
+    print(f"⏱️ Total wall time: {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
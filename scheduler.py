@@ -0,0 +1,99 @@
+import time
+
+CATEGORY_WEIGHTS = {"new-in": 3}  # Relative share of product pages per category (default 1)
+CATEGORY_PAGE_QUOTAS = {}         # Max product pages per category per run, e.g. {"total-look": 50}
+COVERAGE_FLOOR = 5                # In deadline mode, pages every category gets before weights apply
+
+
+class FairScheduler:
+    """
+    Interleaves product URLs across (gender, category) streams.
+
+    Picks use smooth weighted round-robin, so a category with weight 3 gets
+    three pages for every one of a weight-1 category, spread evenly rather
+    than in bursts. With a deadline, every category first gets COVERAGE_FLOOR
+    pages (fewest-served first) and nothing is dispatched once time is up, so
+    an interrupted or time-boxed run still yields a balanced dataset.
+
+    Streams are iterators and are consumed lazily. Skipped URLs don't count
+    as dispatched, so resumed runs spend quotas on new pages only.
+    """
+
+    def __init__(self, weights=CATEGORY_WEIGHTS, quotas=CATEGORY_PAGE_QUOTAS, deadline=None,
+                 coverage_floor=COVERAGE_FLOOR, skip=None):
+        self.weights = weights
+        self.quotas = quotas
+        self.deadline = deadline  # time.monotonic() value, or None
+        self.coverage_floor = coverage_floor
+        self.skip = skip  # Predicate for URLs already done; they don't count towards quotas
+        self.streams = {}     # key -> iterator of URLs
+        self.current = {}     # key -> smooth WRR running score
+        self.dispatched = {}  # key -> pages handed out so far
+
+    @classmethod
+    def with_budget(cls, seconds, **kwargs):
+        return cls(deadline=time.monotonic() + seconds if seconds else None, **kwargs)
+
+    def weight(self, key):
+        return self.weights.get(key[1], 1)
+
+    def add(self, key, urls):
+        if key in self.streams:
+            self.streams[key] = chain_iter(self.streams[key], iter(urls))
+            return
+        self.streams[key] = iter(urls)
+        self.current.setdefault(key, 0)
+        self.dispatched.setdefault(key, 0)
+
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def _pick(self):
+        keys = list(self.streams)
+        if self.deadline is not None:
+            behind = [k for k in keys if self.dispatched[k] < self.coverage_floor]
+            if behind:
+                return min(behind, key=lambda k: (self.dispatched[k], -self.weight(k)))
+        total = 0
+        best = None
+        for key in keys:
+            self.current[key] += self.weight(key)
+            total += self.weight(key)
+            if best is None or self.current[key] > self.current[best]:
+                best = key
+        self.current[best] -= total
+        return best
+
+    def next(self):
+        """
+        Returns (key, url), or None when every stream is drained or time is up.
+        """
+        while self.streams and not self.expired():
+            key = self._pick()
+            if self.dispatched[key] >= self.quotas.get(key[1], float("inf")):
+                del self.streams[key]
+                continue
+            url = next(self.streams[key], None)
+            if url is None:
+                del self.streams[key]
+                continue
+            if self.skip is not None and self.skip(url):
+                continue
+            self.dispatched[key] += 1
+            return key, url
+        return None
+
+    def __iter__(self):
+        while (item := self.next()) is not None:
+            (gender, category), url = item
+            yield gender, category, url
+
+    def report(self):
+        served = sum(1 for count in self.dispatched.values() if count)
+        print(f"⚖️ Dispatched pages for {served}/{len(self.dispatched)} categories"
+              + (" (deadline reached)" if self.expired() else ""))
+
+
+def chain_iter(first, second):
+    yield from first
+    yield from second
@@ -1,43 +1,44 @@
 import asyncio
 import json
+from functools import partial
 from playwright.async_api import async_playwright
 
+import file_writer
+from link_harvest import harvest_links, quota_for, scroll_until_quota
+from locales import DEFAULT_LOCALE, locale_file, store_prefix
+import tracing
+
 CONCURRENT_TASKS = 4  # Adjust based on system/network
 
 
-async def scrape_links_from_category(sem, url, gender, category, browser, output_file, results):
+async def scrape_links_from_category(sem, url, gender, category, browser, output_file, results, locale=DEFAULT_LOCALE):
+    waiting_since = tracing.now()
     async with sem:
+        tracing.record("semaphore wait", waiting_since, category=category)
         page = await browser.new_page()
         try:
-            await page.goto(url, timeout=60000)
-            await page.wait_for_timeout(4000)
-
-            for i in range(0, 1000000, 1000):
-                await page.evaluate(f"window.scrollTo(0, {i})")
-
-            anchors = await page.query_selector_all("a[href*='/in/en/'][href*='p0']")
-            links = set()
-
-            for a in anchors:
-                if len(links) >= 200:
-                    print(f"🔢 Reached link cap (200) for {gender} → {category}")
-                    break
-                href = await a.get_attribute("href")
-                if href and href.startswith("https://www.zara.com/in/en/") and "p0" in href:
-                    full_link = href.split("?")[0]
-                    links.add(full_link)
+            with tracing.span("goto", category=category):
+                await page.goto(url, timeout=60000)
+                await page.wait_for_timeout(4000)
+
+            quota = quota_for(category)
+            with tracing.span("scroll", category=category):
+                await scroll_until_quota(page, quota, store_prefix(locale))
+            with tracing.span("harvest links", category=category):
+                links = await harvest_links(page, quota, store_prefix(locale))
+            if len(links) >= quota:
+                print(f"🔢 Reached link cap ({quota}) for {gender} → {category}")
 
             print(f"✅ {len(links)} links found for {gender} → {category}")
 
             # Update the results dictionary with the new links
-            results[gender][category] = list(links)
+            results[gender][category] = links
 
-            # Write the updated results to the JSON file immediately
-            with open(output_file, "w") as f:
-                json.dump(results, f, indent=2)
-            print(f"📝 Updated {output_file} with links for {gender} → {category}")
+            # Queue a rewrite of the JSON file; bursts of categories collapse into one write
+            file_writer.replace_json(output_file, partial(snapshot_results, results), indent=2)
+            print(f"📝 Queued update of {output_file} with links for {gender} → {category}")
 
-            return gender, category, list(links)
+            return gender, category, links
         except Exception as e:
             print(f"⚠️ Failed {gender} → {category}: {e}")
             return gender, category, []
@@ -45,11 +46,12 @@ async def scrape_links_from_category(sem, url, gender, category, browser, output
             await page.close()
 
 
-async def main(categories_file="zara_categories.json", output_file="zara_product_links.json"):
-    # Load the categories JSON file
-    with open(categories_file, "r") as f:
-        categories = json.load(f)
+def snapshot_results(results):
+    # Category lists are replaced, never mutated, so copying the two dict levels is enough
+    return {gender: dict(cat_map) for gender, cat_map in results.items()}
+
 
+def load_results(categories, output_file):
     # Initialize the results dictionary
     results = {gender: {} for gender in categories}
 
@@ -62,6 +64,19 @@ async def main(categories_file="zara_categories.json", output_file="zara_product
                     results[gender] = existing_results[gender]
     except FileNotFoundError:
         pass  # File doesn't exist yet, start fresh
+    return results
+
+
+async def main(categories_file="zara_categories.json", output_file="zara_product_links.json", locale=DEFAULT_LOCALE):
+    categories_file = locale_file(categories_file, locale)
+    output_file = locale_file(output_file, locale)
+
+    # Load the categories JSON file
+    with open(categories_file, "r") as f:
+        categories = json.load(f)
+
+    results = load_results(categories, output_file)
+    file_writer.enable()
 
     sem = asyncio.Semaphore(CONCURRENT_TASKS)
 
@@ -75,7 +90,7 @@ async def main(categories_file="zara_categories.json", output_file="zara_product
                 if gender in results and category in results[gender] and results[gender][category]:
                     print(f"⏭️ Skipping {gender} → {category} (already processed)")
                     continue
-                tasks.append(scrape_links_from_category(sem, url, gender, category, browser, output_file, results))
+                tasks.append(scrape_links_from_category(sem, url, gender, category, browser, output_file, results, locale))
 
         if tasks:
             await asyncio.gather(*tasks)
@@ -84,8 +99,10 @@ async def main(categories_file="zara_categories.json", output_file="zara_product
 
         await browser.close()
 
+    await file_writer.finish()
     print(f"\n🎉 All product links saved to {output_file}")
 
 
 # Run the scraper
-asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
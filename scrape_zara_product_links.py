@@ -2,39 +2,42 @@ import asyncio
 import json
 from playwright.async_api import async_playwright
 
+from link_harvest import harvest_links, quota_for, scroll_until_quota
+from locales import DEFAULT_LOCALE, locale_file, store_prefix
+import tracing
+
 CONCURRENT_TASKS = 4  # Adjust based on system/network
 
-async def scrape_links_from_category(sem, url, gender, category, browser):
+async def scrape_links_from_category(sem, url, gender, category, browser, locale=DEFAULT_LOCALE):
+    waiting_since = tracing.now()
     async with sem:
+        tracing.record("semaphore wait", waiting_since, category=category)
         page = await browser.new_page()
         try:
-            await page.goto(url, timeout=60000)
-            await page.wait_for_timeout(4000)
-
-            for i in range(0, 1000000, 1000):
-                await page.evaluate(f"window.scrollTo(0, {i})")
-
-            anchors = await page.query_selector_all("a[href*='/in/en/'][href*='p0']")
-            links = set()
-
-            for a in anchors:
-                if len(links) >= 200:
-                    print(f"🔢 Reached link cap (200) for {gender} → {category}")
-                    break
-                href = await a.get_attribute("href")
-                if href and href.startswith("https://www.zara.com/in/en/") and "p0" in href:
-                    full_link = href.split("?")[0]
-                    links.add(full_link)
+            with tracing.span("goto", category=category):
+                await page.goto(url, timeout=60000)
+                await page.wait_for_timeout(4000)
+
+            quota = quota_for(category)
+            with tracing.span("scroll", category=category):
+                await scroll_until_quota(page, quota, store_prefix(locale))
+            with tracing.span("harvest links", category=category):
+                links = await harvest_links(page, quota, store_prefix(locale))
+            if len(links) >= quota:
+                print(f"🔢 Reached link cap ({quota}) for {gender} → {category}")
 
             print(f"✅ {len(links)} links found for {gender} → {category}")
-            return gender, category, list(links)
+            return gender, category, links
         except Exception as e:
             print(f"⚠️ Failed {gender} → {category}: {e}")
             return gender, category, []
         finally:
             await page.close()
 
-async def main(categories_file="zara_categories.json", output_file="zara_product_links.json"):
+async def main(categories_file="zara_categories.json", output_file="zara_product_links.json", locale=DEFAULT_LOCALE):
+    categories_file = locale_file(categories_file, locale)
+    output_file = locale_file(output_file, locale)
+
     with open(categories_file, "r") as f:
         categories = json.load(f)
 
@@ -47,7 +50,7 @@ async def main(categories_file="zara_categories.json", output_file="zara_product
 
         for gender, cat_map in categories.items():
             for category, url in cat_map.items():
-                tasks.append(scrape_links_from_category(sem, url, gender, category, browser))
+                tasks.append(scrape_links_from_category(sem, url, gender, category, browser, locale))
 
         all_results = await asyncio.gather(*tasks)
 
@@ -62,4 +65,5 @@ async def main(categories_file="zara_categories.json", output_file="zara_product
     print(f"\n🎉 All product links saved to {output_file}")
 
 # Run the scraper
-asyncio.run(main())
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,314 @@
+import hashlib
+import json
+import math
+import mmap
+import os
+import sqlite3
+import struct
+
+import file_writer
+
+BLOOM_CAPACITY = 5_000_000  # Items per store before the false-positive rate starts to climb
+BLOOM_ERROR_RATE = 0.01     # False positives only cost an index lookup, never a wrong answer
+
+BLOOM_MAGIC = b"SEENBLM1"
+BLOOM_HEADER = struct.Struct("<8sQQQ")  # magic, bits, hashes, items committed to the index when last synced
+
+
+def connect(path):
+    # Each store has a reader used on the loop thread and a writer used on the writer thread
+    db = sqlite3.connect(f"{path}.db", check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+class BloomFilter:
+    """
+    Fixed-size bloom filter in an mmapped file: opening it costs the same no
+    matter how many items it holds, and it never says "no" for an added item.
+    """
+
+    def __init__(self, path, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.path = path
+        bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.bits = (bits + 7) // 8 * 8
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.size = BLOOM_HEADER.size + self.bits // 8
+        self.file = None
+        self.mm = None
+
+    def open(self):
+        """
+        Maps the file, creating or resetting it if missing or sized for other
+        settings. Returns the item count the bits were last synced for.
+        """
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) == self.size
+        self.file = open(self.path, "r+b" if exists else "w+b")
+        if not exists:
+            self.file.truncate(self.size)  # Sparse: untouched pages cost no disk
+        self.mm = mmap.mmap(self.file.fileno(), self.size)
+        magic, bits, hashes, synced = BLOOM_HEADER.unpack_from(self.mm)
+        if exists and (magic, bits, hashes) == (BLOOM_MAGIC, self.bits, self.hashes):
+            return synced
+        self.reset()
+        return 0
+
+    def reset(self):
+        self.mm[:] = bytes(self.size)
+        self.mark_synced(0)
+
+    def positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        mm, offset = self.mm, BLOOM_HEADER.size
+        return all(mm[offset + (p >> 3)] & (1 << (p & 7)) for p in self.positions(key))
+
+    def add(self, key):
+        mm, offset = self.mm, BLOOM_HEADER.size
+        for p in self.positions(key):
+            mm[offset + (p >> 3)] |= 1 << (p & 7)
+
+    def mark_synced(self, count):
+        """
+        Flushes the bits, then records that they cover count indexed items.
+        """
+        self.mm.flush()
+        BLOOM_HEADER.pack_into(self.mm, 0, BLOOM_MAGIC, self.bits, self.hashes, count)
+        self.mm.flush(0, mmap.PAGESIZE)
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.file.close()
+            self.mm = None
+
+
+class SeenSet:
+    """
+    Persistent set of strings (URLs, image paths) for resume and skip checks.
+
+    A bloom filter (<path>.bloom) answers most lookups from memory; only its
+    "maybe" answers are confirmed against an exact SQLite index (<path>.db).
+    Memory stays fixed as history grows, and opening it doesn't read the
+    history at all. New items are kept in memory until flush() hands them to
+    the writer thread, which commits them in one transaction.
+    """
+
+    def __init__(self, path, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.path = path
+        self.bloom = BloomFilter(f"{path}.bloom", capacity, error_rate)
+        self.reader = None
+        self.writer = None
+        self.count = 0
+        self.pending = set()  # Added but not yet committed; checked before the index
+        self.unflushed = []   # Added since the last flush()
+
+    def open(self):
+        self.reader = connect(self.path)
+        self.writer = connect(self.path)
+        self.writer.executescript("""
+            CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER);
+            INSERT OR IGNORE INTO meta VALUES ('count', 0);
+        """)
+        self.writer.commit()
+        self.count = self.reader.execute("SELECT value FROM meta WHERE name = 'count'").fetchone()[0]
+        if self.bloom.open() != self.count:
+            self._rebuild_bloom()
+        return self
+
+    def _rebuild_bloom(self):
+        # Only after a crash between an index commit and the bloom sync, or new settings
+        print(f"🔧 Rebuilding {self.bloom.path} from {self.count} indexed items")
+        self.bloom.reset()
+        for (key,) in self.reader.execute("SELECT key FROM seen"):
+            self.bloom.add(key)
+        self.bloom.mark_synced(self.count)
+
+    def __contains__(self, key):
+        if key not in self.bloom:
+            return False
+        if key in self.pending:
+            return True
+        return self.reader.execute("SELECT 1 FROM seen WHERE key = ?", (key,)).fetchone() is not None
+
+    def __len__(self):
+        return self.count
+
+    def add(self, key):
+        if key in self:
+            return
+        self.bloom.add(key)
+        self.pending.add(key)
+        self.unflushed.append(key)
+        self.count += 1
+
+    def update(self, keys):
+        for key in keys:
+            self.add(key)
+
+    def flush(self):
+        batch, self.unflushed = self.unflushed, []
+        if batch:
+            file_writer.post(self._commit, batch)
+
+    def save(self):
+        """
+        Debounced flush(): cheap enough to call after every add.
+        """
+        file_writer.schedule(self.path, self.flush)
+
+    def commit(self):
+        """
+        Synchronous flush, for startup work such as migrations.
+        """
+        batch, self.unflushed = self.unflushed, []
+        self._commit(batch)
+
+    def _commit(self, batch):
+        if not batch:
+            return
+        cursor = self.writer.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((key,) for key in batch))
+        self.writer.execute("UPDATE meta SET value = value + ? WHERE name = 'count'", (cursor.rowcount,))
+        self.writer.commit()
+        self.pending.difference_update(batch)
+        count = self.writer.execute("SELECT value FROM meta WHERE name = 'count'").fetchone()[0]
+        self.bloom.mark_synced(count)
+
+    def clear(self):
+        self.writer.execute("DELETE FROM seen")
+        self.writer.execute("UPDATE meta SET value = 0 WHERE name = 'count'")
+        self.writer.commit()
+        self.bloom.reset()
+        self.pending.clear()
+        self.unflushed = []
+        self.count = 0
+
+    def close(self):
+        """
+        Call after the writer thread has finished with this set.
+        """
+        self.commit()
+        self.reader.close()
+        self.writer.close()
+        self.bloom.close()
+
+
+class RecordStore:
+    """
+    Persistent map of string keys to JSON values in SQLite (<path>.db).
+
+    Lookups read one row, and put() only queues that row: changes are kept in
+    memory until flush() hands them to the writer thread, which upserts just
+    the changed rows in one transaction. Values must not be mutated once put.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.reader = None
+        self.writer = None
+        self.pending = {}    # Put but not yet committed; checked before the table
+        self.unflushed = {}  # Put since the last flush()
+
+    def open(self):
+        self.reader = connect(self.path)
+        self.writer = connect(self.path)
+        self.writer.execute("CREATE TABLE IF NOT EXISTS records (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID")
+        self.writer.commit()
+        return self
+
+    def get(self, key, default=None):
+        if key in self.pending:
+            return self.pending[key]
+        row = self.reader.execute("SELECT value FROM records WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def __len__(self):
+        # Only for reporting; pending keys may already be in the table
+        return self.reader.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def put(self, key, value):
+        self.pending[key] = value
+        self.unflushed[key] = value
+
+    def update(self, records):
+        for key, value in records.items():
+            self.put(key, value)
+
+    def flush(self):
+        batch, self.unflushed = self.unflushed, {}
+        if batch:
+            file_writer.post(self._commit, batch)
+
+    def save(self):
+        """
+        Debounced flush(): cheap enough to call after every put.
+        """
+        file_writer.schedule(self.path, self.flush)
+
+    def commit(self):
+        """
+        Synchronous flush, for startup work such as migrations.
+        """
+        batch, self.unflushed = self.unflushed, {}
+        self._commit(batch)
+
+    def _commit(self, batch):
+        if not batch:
+            return
+        self.writer.executemany(
+            "INSERT OR REPLACE INTO records VALUES (?, ?)",
+            ((key, json.dumps(value)) for key, value in batch.items()),
+        )
+        self.writer.commit()
+        for key, value in batch.items():
+            if self.pending.get(key) is value:  # Not put again since this batch was taken
+                del self.pending[key]
+
+    def close(self):
+        """
+        Call after the writer thread has finished with this store.
+        """
+        self.commit()
+        self.reader.close()
+        self.writer.close()
+
+
+class PartitionedSeenSet:
+    """
+    One SeenSet per partition (e.g. per store locale), so each can be reset
+    on its own. partition(key) picks the set; path_for(partition) names its
+    files. Sets are opened on first use.
+    """
+
+    def __init__(self, path_for, partition):
+        self.path_for = path_for
+        self.partition = partition
+        self.parts = {}
+
+    def part(self, name):
+        if name not in self.parts:
+            self.parts[name] = SeenSet(self.path_for(name)).open()
+        return self.parts[name]
+
+    def __contains__(self, key):
+        return key in self.part(self.partition(key))
+
+    def __len__(self):
+        return sum(len(part) for part in self.parts.values())
+
+    def add(self, key):
+        self.part(self.partition(key)).add(key)
+
+    def save(self):
+        for part in self.parts.values():
+            part.save()
+
+    def close(self):
+        for part in self.parts.values():
+            part.close()
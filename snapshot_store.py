@@ -0,0 +1,38 @@
+import gzip
+import hashlib
+import json
+import os
+
+from image_index import extract_product_id
+from locales import DEFAULT_LOCALE, locale_from_url
+
+SNAPSHOT_DIR = "snapshots"
+
+
+def snapshot_path(url, folder, root=SNAPSHOT_DIR):
+    """
+    snapshots/<gender>/<category>/<product id>.<locale>.json.gz, mirroring zara_images/.
+    """
+    locale = (locale_from_url(url) or DEFAULT_LOCALE).replace("/", "-")
+    name = f"{extract_product_id(url) or hashlib.sha1(url.encode()).hexdigest()[:12]}.{locale}.json.gz"
+    parts = os.path.normpath(folder).split(os.sep)[1:]  # drop the images root
+    return os.path.join(root, *parts, name)
+
+
+def save_snapshot(url, folder, images, source, root=SNAPSHOT_DIR):
+    """
+    Stores the candidate images collected from a rendered page (before any
+    selection rules run), so selection can be re-run later without a browser.
+    """
+    path = snapshot_path(url, folder, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump({"url": url, "folder": folder, "source": source, "images": images}, f)
+
+
+def iter_snapshots(root=SNAPSHOT_DIR):
+    for folder, _, files in os.walk(root):
+        for name in files:
+            if name.endswith(".json.gz"):
+                with gzip.open(os.path.join(folder, name), "rt", encoding="utf-8") as f:
+                    yield json.load(f)
@@ -1,164 +1,415 @@
+import argparse
 import asyncio
 import json
 import os
-import re
-from urllib.parse import urlparse
+import time
+from functools import partial
 from urllib.parse import urljoin
 import aiohttp
 from playwright.async_api import async_playwright
 
-SCRAPED_LOG_FILE = "scraped_log.json"
+from browser_supervisor import BrowserSupervisor
+import file_writer
+from gallery_capture import GalleryCapture
+from image_index import ImageIndex, extract_product_id
+from image_rules import load_rules
+from image_variants import TARGET_WIDTH, parse_srcset, select_variant, width_from_url
+from link_stream import index_categories, iter_category_links
+from locales import DEFAULT_LOCALE, LOCALES, locale_file, locale_from_url
+from scheduler import FairScheduler
+from seen_store import PartitionedSeenSet
+from snapshot_store import iter_snapshots, save_snapshot
+import tracing
+
+SCRAPED_LOG_FILE = "scraped_log.json"  # Legacy per-locale JSON logs, migrated into SCRAPED_LOG_STORE
+SCRAPED_LOG_STORE = "scraped_log"      # scraped_log.db + scraped_log.bloom, one pair per locale
+IMAGES_DIR = "zara_images"
 CONCURRENT_TASKS = 8  # Tune based on CPU/network
+BROWSER_RETRIES = 2  # Extra attempts for a URL whose page died with the browser
+MEASURE_SAVINGS = False  # HEAD the max-resolution variant of every image to report bytes saved (one extra request each)
+CAPTURE_MODE = "network"  # "network": read the gallery JSON as it arrives; "dom": scroll and read <img> tags
+COMPARE_CAPTURE_METHODS = False  # Also run the DOM scrape after a network capture to compare counts
+SAVE_SNAPSHOTS = True  # Keep each page's candidate images in snapshots/ for --reextract
+TRACE = False  # Record per-URL spans to trace.json (Chrome trace-event format)
+PROFILE = False  # With TRACE, also sample Python stacks into profile.folded
+
+DONE = None  # Queue sentinel telling an image worker to stop
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "Referer": "https://www.zara.com/",
+}
+
+# Reads every <img> in one round trip, including <source> srcsets of its <picture>
+COLLECT_IMAGES_JS = """
+() => Array.from(document.querySelectorAll("img")).map(img => {
+    const picture = img.parentElement && img.parentElement.tagName === "PICTURE" ? img.parentElement : null;
+    const sources = picture ? Array.from(picture.querySelectorAll("source")).map(s => s.getAttribute("srcset")) : [];
+    return {
+        src: img.getAttribute("src") || img.getAttribute("data-src") || "",
+        srcset: [img.getAttribute("srcset"), ...sources].filter(Boolean).join(", "),
+        alt: img.getAttribute("alt") || "",
+    };
+})
+"""
+
+download_stats = {"files": 0, "bytes": 0, "max_bytes": 0, "first_saved_at": None}
+capture_stats = {"network_hits": 0, "network_misses": 0, "network_images": 0, "dom_images": 0}
 
 # Helper functions
-def extract_base_name(alt_text):
-    alt_clean = re.sub(r"(?i)\s*by\s+Zara", "", alt_text)
-    alt_clean = re.sub(r"(?i)\s*Image\s*\d+", "", alt_text)
-    alt_clean = alt_clean.strip().replace("-", "").replace(" ", "_")
-    if not alt_clean.endswith("_"):
-        alt_clean += "_"
-    return f"{alt_clean}"
-
-def extract_filename_from_src(src):
-    clean_src = src.split("?")[0]
-    return os.path.basename(urlparse(clean_src).path)
-
-async def download_image(session, url, folder, filename):
-    os.makedirs(folder, exist_ok=True)
-    filepath = os.path.join(folder, filename)
-    if os.path.exists(filepath):
+def resolve_image(src, srcset, page_url):
+    """
+    Picks the variant closest to TARGET_WIDTH from src and srcset.
+    Returns (url, max_url), both absolute.
+    """
+    variants = parse_srcset(srcset)
+    if src and not load_rules().excludes(src):
+        variants.append((src, width_from_url(src)))
+    if not variants:
+        variants = [(src, None)]
+    chosen, max_src = select_variant(variants, TARGET_WIDTH)
+    return urljoin(page_url, chosen), urljoin(page_url, max_src)
+
+async def measure_max_bytes(session, max_url, fallback):
+    if not MEASURE_SAVINGS:
+        return fallback
+    try:
+        async with session.head(max_url, headers=HEADERS) as response:
+            return response.content_length or fallback
+    except Exception:
+        return fallback
+
+async def download_image(session, url, folder, filename, index, max_url=None):
+    """
+    Downloads one image. Returns True once it is on disk (or already was).
+    """
+    if index.has(folder, filename):
         print(f"⏩ Skipped (already exists): {filename}")
-        return
+        return True
+    filepath = os.path.join(folder, filename)
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0",
-            "Referer": "https://www.zara.com/",
-        }
-        async with session.get(url, headers=headers) as response:
-            if response.status == 200:
-                with open(filepath, 'wb') as f:
-                    f.write(await response.read())
-                print(f"✅ Saved: {filename}")
-            else:
+        with tracing.span("download", file=filename):
+            async with session.get(url, headers=HEADERS) as response:
+                if response.status == 200:
+                    body = await response.read()
+                    await file_writer.write_bytes(filepath, body)
+                    index.add(folder, filename)
+                    download_stats["files"] += 1
+                    if download_stats["first_saved_at"] is None:
+                        download_stats["first_saved_at"] = time.monotonic()
+                    download_stats["bytes"] += len(body)
+                    if max_url and max_url != url:
+                        download_stats["max_bytes"] += max(len(body), await measure_max_bytes(session, max_url, len(body)))
+                    else:
+                        download_stats["max_bytes"] += len(body)
+                    print(f"✅ Saved: {filename}")
+                    return True
                 print(f"❌ Failed to download ({response.status}): {url}")
     except Exception as e:
         print(f"🚫 Error downloading {url}: {e}")
+    return False
+
+def select_images(images, page_url):
+    """
+    Applies the rules in image_rules.json to collected images.
+    Returns (src, filename, max_src) tuples to download.
+    """
+    candidates = []
+    for img in images:
+        if not img["src"] and not img["srcset"]:
+            continue
+        src, max_src = resolve_image(img["src"], img["srcset"], page_url)
+        candidates.append((src, max_src, img["alt"]))
 
-async def scrape_filtered_zara_images(url, folder, browser):
+    image_links = []
+    for src, filename, max_src, tier in load_rules().select(candidates):
+        print(f"⬇️ Selected ({tier}): {src}")
+        image_links.append((src, filename, max_src))
+
+    return image_links
+
+async def collect_dom_images(page, url):
+    with tracing.span("scroll", url=url):
+        for i in range(0, 20000, 2000):
+            await page.evaluate(f"window.scrollTo(0, {i})")
+            await page.wait_for_timeout(200)
+
+    with tracing.span("collect <img>", url=url):
+        images = await page.evaluate(COLLECT_IMAGES_JS)
+    capture_stats["dom_images"] += len(images)
+    print(f"🔍 Found {len(images)} <img> tags on: {url}")
+    return images
+
+async def scrape_filtered_zara_images(url, folder, browser, index):
+    """
+    Renders a product page and downloads its selected images. Returns the
+    number of selected images that could not be saved.
+    """
     page = await browser.new_page()
 
     await page.route("**/*", lambda route, request: asyncio.create_task(
-        route.continue_() if request.resource_type in ["document", "image", "script", "xhr"] else route.abort()
+        route.continue_() if request.resource_type in ["document", "image", "script", "xhr", "fetch"] else route.abort()
     ))
 
+    capture = GalleryCapture(page, extract_product_id(url)) if CAPTURE_MODE == "network" else None
+
     try:
-        await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+        if capture:
+            with tracing.span("goto", url=url):
+                await page.goto(url, timeout=60000, wait_until="commit")
+            with tracing.span("network capture", url=url):
+                images = await capture.wait()
+            source = "network" if images else "dom"
+            capture_stats["network_images"] += len(images)
+            if images:
+                capture_stats["network_hits"] += 1
+                print(f"📡 Captured {len(images)} gallery images from network on: {url}")
+            else:
+                capture_stats["network_misses"] += 1
+                print(f"↩️ No gallery JSON captured, falling back to DOM on: {url}")
+            if not images or COMPARE_CAPTURE_METHODS:
+                with tracing.span("domcontentloaded", url=url):
+                    await page.wait_for_load_state("domcontentloaded", timeout=60000)
+                dom_images = await collect_dom_images(page, url)
+                images = images or dom_images
+        else:
+            with tracing.span("goto", url=url):
+                await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+            images = await collect_dom_images(page, url)
+            source = "dom"
 
-        for i in range(0, 20000, 2000):
-            await page.evaluate(f"window.scrollTo(0, {i})")
-            await page.wait_for_timeout(200)
+        if SAVE_SNAPSHOTS:
+            await file_writer.submit(save_snapshot, url, folder, images, source)
 
-        images = await page.query_selector_all("img")
-        print(f"🔍 Found {len(images)} <img> tags on: {url}")
-
-        image_links = []
-        image_filenames = set()
-
-        pattern_alt = re.compile(r"Image\s+\d+", re.IGNORECASE)
-        pattern_ult = re.compile(r"ult\d+\.(jpg|jpeg|png|webp)$", re.IGNORECASE)
-        pattern_e = re.compile(r"e[12]\.(jpg|jpeg|png|webp)$", re.IGNORECASE)
-
-        for img in images:
-            src = await img.get_attribute("src") or await img.get_attribute("data-src") or await img.get_attribute("srcset")
-            alt = await img.get_attribute("alt") or ""
-            if not src:
-                continue
-            if "," in src:  # handle srcset
-                src = src.split(",")[0].split()[0]
-            src = urljoin(url, src)
-            clean_src = src.split("?")[0]
-
-            if pattern_alt.search(alt) and (pattern_e.search(clean_src) or pattern_ult.search(clean_src)):
-                base = extract_base_name(alt)
-                file = extract_filename_from_src(src)
-                filename = f"{base}_{file}"
-                if filename not in image_filenames:
-                    print(f"⬇️ Trying to download: {src}")
-                    image_links.append((src, filename))
-                    image_filenames.add(filename)
-
-        # Fallback logic if too few images
-        if len(image_links) < 2:
-            for img in images:
-                src = await img.get_attribute("src") or await img.get_attribute("data-src") or await img.get_attribute("srcset")
-                if not src:
-                    continue
-                if "," in src:
-                    src = src.split(",")[0].split()[0]
-                src = urljoin(url, src)
-                clean_src = src.split("?")[0]
-                if pattern_ult.search(clean_src):
-                    file = extract_filename_from_src(src)
-                    if file not in image_filenames:
-                        print(f"⬇️ Fallback download: {src}")
-                        image_links.append((src, file))
-                        image_filenames.add(file)
+        with tracing.span("extract", url=url):
+            image_links = select_images(images, url)
+
+        index.record_product(url, [filename for _, filename, _ in image_links], folder)
+        index.save_manifest()
 
+        failed = 0
         async with aiohttp.ClientSession() as session:
-            for src, filename in image_links:
-                await download_image(session, src, folder, filename)
+            for src, filename, max_src in image_links:
+                if not await download_image(session, src, folder, filename, index, max_src):
+                    failed += 1
+        return failed
 
     finally:
         await page.close()
 
 # Resume support: load & save scraped log
-def load_scraped_log():
-    if os.path.exists(SCRAPED_LOG_FILE):
-        with open(SCRAPED_LOG_FILE, "r") as f:
-            return set(json.load(f))
-    return set()
+def url_locale(url):
+    return locale_from_url(url) or DEFAULT_LOCALE
 
-def save_scraped_log(scraped_set):
-    with open(SCRAPED_LOG_FILE, "w") as f:
-        json.dump(list(scraped_set), f, indent=2)
+def load_scraped_log(locales=(DEFAULT_LOCALE,), resume=True):
+    """
+    Opens the persistent scraped log, one store per locale, importing any
+    legacy JSON log once (renamed to *.migrated afterwards). Without resume,
+    only the given locales are reset.
+    """
+    scraped = PartitionedSeenSet(partial(locale_file, SCRAPED_LOG_STORE), url_locale)
+    for locale in locales:
+        store = scraped.part(locale)
+        path = locale_file(SCRAPED_LOG_FILE, locale)
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                urls = json.load(f)
+            store.update(urls)
+            store.commit()
+            os.replace(path, f"{path}.migrated")
+            print(f"📦 Migrated {len(urls)} URLs from {path} to {store.path}.db")
+        if not resume:
+            store.clear()
+    print(f"📒 {len(scraped)} pages in scraped log")
+    return scraped
 
-async def scrape_with_semaphore(sem, url, folder, browser, scraped_log):
+def save_scraped_log(scraped_log):
+    # Debounced, so this is cheap to call after every page
+    scraped_log.save()
+
+async def scrape_with_semaphore(sem, url, folder, browser, scraped_log, index):
+    waiting_since = tracing.now()
     async with sem:
-        print(f"📥 Scraping: {url}")
+        tracing.record("semaphore wait", waiting_since, url=url)
+        for attempt in range(BROWSER_RETRIES + 1):
+            generation = browser.generation
+            print(f"📥 Scraping: {url}")
+            try:
+                with tracing.span("scrape", url=url, attempt=attempt):
+                    failed = await scrape_filtered_zara_images(url, folder, browser, index)
+                if failed:
+                    # Not logged as scraped, so the next run tries the missing images again
+                    print(f"⚠️ {failed} images not saved for {url}; it will be retried next run")
+                    return
+                scraped_log.add(url)
+                save_scraped_log(scraped_log)
+                return
+            except Exception as e:
+                # A crash or restart took the page down with it: try again on the new browser
+                if attempt < BROWSER_RETRIES and browser.lost_since(generation):
+                    print(f"🔁 Retrying {url} after browser restart")
+                    continue
+                print(f"⚠️ Failed {url}: {e}")
+                return
+
+def image_folder(gender, category):
+    return os.path.join(IMAGES_DIR, gender, category)
+
+async def should_skip(url, folder, scraped_log, index):
+    if url in scraped_log:
+        return True
+    if index.is_complete(url, folder):
+        print(f"⏭️ Skipping {url} (all images already on disk)")
+        scraped_log.add(url)
+        return True
+    reused = await index.reuse(url, folder)
+    if reused:
+        print(f"♻️ Reused {reused} images for {url} (same product already downloaded)")
+        scraped_log.add(url)
+        return True
+    return False
+
+async def finish_run(scraped_log, index):
+    save_scraped_log(scraped_log)
+    index.save_manifest()
+    await file_writer.finish()
+    scraped_log.close()
+    index.close()
+    report_download_stats()
+    report_capture_stats()
+
+async def image_worker(queue, sem, browser, scraped_log, index):
+    while True:
+        item = await queue.get()
+        if item is DONE:
+            return
+        url, folder, queued_at = item
+        tracing.record("queue wait", queued_at, url=url)
+        index.ensure_folder(folder)
+        if await should_skip(url, folder, scraped_log, index) or not index.claim(url, folder):
+            continue
         try:
-            await scrape_filtered_zara_images(url, folder, browser)
-            scraped_log.add(url)
-        except Exception as e:
-            print(f"⚠️ Failed {url}: {e}")
+            await scrape_with_semaphore(sem, url, folder, browser, scraped_log, index)
+        finally:
+            index.release(url, folder)
 
-async def scrape_all(data):
-    scraped_log = load_scraped_log()
+async def scrape_all(links, scraped_log, rescan=False):
+    """
+    Scrapes (gender, category, url) triples with a fixed pool of workers.
+    links is consumed lazily, so a streaming reader keeps memory flat.
+    """
+    index = await asyncio.to_thread(ImageIndex(IMAGES_DIR).build, rescan)
     sem = asyncio.Semaphore(CONCURRENT_TASKS)
+    queue = asyncio.Queue(maxsize=CONCURRENT_TASKS * 2)
 
     async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=False)
-        tasks = []
-
-        for gender, cat_map in data.items():
-            for category, links in cat_map.items():
-                folder_path = os.path.join("zara_images", gender, category)
-                os.makedirs(folder_path, exist_ok=True)
-
-                for url in links:
-                    if url in scraped_log:
-                        continue
-                    tasks.append(
-                        scrape_with_semaphore(sem, url, folder_path, browser, scraped_log)
-                    )
-
-        await asyncio.gather(*tasks)
+        browser = await BrowserSupervisor(p, headless=False).start()
+        workers = [
+            asyncio.create_task(image_worker(queue, sem, browser, scraped_log, index))
+            for _ in range(CONCURRENT_TASKS)
+        ]
+
+        for gender, category, url in links:
+            await queue.put((url, image_folder(gender, category), tracing.now()))
+
+        for _ in workers:
+            await queue.put(DONE)
+        await asyncio.gather(*workers)
         await browser.close()
-        save_scraped_log(scraped_log)
+        await finish_run(scraped_log, index)
+
+def report_download_stats():
+    summary = (f"📦 Downloaded {download_stats['files']} images, {download_stats['bytes'] / 1e6:.1f} MB "
+               f"at ~{TARGET_WIDTH}px")
+    if MEASURE_SAVINGS:
+        saved = download_stats["max_bytes"] - download_stats["bytes"]
+        summary += f"; saved {saved / 1e6:.1f} MB vs max resolution"
+    print(summary)
+
+def report_capture_stats():
+    print(f"📡 Network capture: {capture_stats['network_hits']} products, {capture_stats['network_images']} images; "
+          f"{capture_stats['network_misses']} fell back to DOM")
+    print(f"🔍 DOM scrape: {capture_stats['dom_images']} <img> tags")
+
+def schedule_locale_links(json_file, locales, scheduler):
+    for locale in locales:
+        path = locale_file(json_file, locale)
+        if not os.path.exists(path):
+            print(f"⚠️ No links file for {locale}: {path}")
+            continue
+        for gender, category, offset in index_categories(path):
+            scheduler.add((gender, category), iter_category_links(path, offset))
+    return scheduler
+
+async def main(json_file="zara_product_links.json", locales=LOCALES, deadline=None, rescan=False):
+    load_rules()
+    if TRACE:
+        tracing.enable(profile_file=tracing.PROFILE_FILE if PROFILE else None)
+    file_writer.enable()
+    try:
+        scraped_log = await asyncio.to_thread(load_scraped_log, locales)
+        scheduler = FairScheduler.with_budget(deadline, skip=scraped_log.__contains__)
+        await scrape_all(schedule_locale_links(json_file, locales, scheduler), scraped_log, rescan)
+        scheduler.report()
+    finally:
+        await file_writer.finish()  # Writer thread records spans, so it stops before the tracer
+        tracing.finish()
+
+async def download_worker(queue, session, index):
+    while True:
+        item = await queue.get()
+        if item is DONE:
+            return
+        src, folder, filename, max_src = item
+        await download_image(session, src, folder, filename, index, max_src)
+
+async def reextract(rescan=False):
+    """
+    Re-runs the selection rules over saved snapshots, with no browser, and
+    downloads only the images they newly select.
+    """
+    load_rules()
+    file_writer.enable()
+    index = await asyncio.to_thread(ImageIndex(IMAGES_DIR).build, rescan)
+    queue = asyncio.Queue(maxsize=CONCURRENT_TASKS * 2)
+    snapshots = selected = queued = 0
+
+    async with aiohttp.ClientSession() as session:
+        workers = [asyncio.create_task(download_worker(queue, session, index)) for _ in range(CONCURRENT_TASKS)]
+
+        for snapshot in iter_snapshots():
+            url, folder = snapshot["url"], snapshot["folder"]
+            image_links = select_images(snapshot["images"], url)
+            index.record_product(url, [filename for _, filename, _ in image_links], folder)
+            snapshots += 1
+            selected += len(image_links)
+            for src, filename, max_src in image_links:
+                if not index.has(folder, filename):
+                    queued += 1
+                    await queue.put((src, folder, filename, max_src))
+
+        for _ in workers:
+            await queue.put(DONE)
+        await asyncio.gather(*workers)
+
+    index.save_manifest()
+    await file_writer.finish()
+    index.close()
+    print(f"🧪 Re-extracted {snapshots} snapshots: {selected} images selected, {queued} new to download")
+    report_download_stats()
 
-async def main(json_file="zara_product_links.json"):
-    with open(json_file, "r") as f:
-        data = json.load(f)
-    await scrape_all(data)
+def parse_args():
+    parser = argparse.ArgumentParser(description="Download Zara product images.")
+    parser.add_argument("--reextract", action="store_true",
+                        help="Re-run the selection rules over saved snapshots instead of rendering pages")
+    parser.add_argument("--deadline", type=float, default=None, metavar="MINUTES",
+                        help="Stop dispatching product pages after this long, favouring category coverage")
+    parser.add_argument("--rescan", action="store_true",
+                        help="Rebuild the image file index from disk (after deleting or moving images by hand)")
+    return parser.parse_args()
 
 # Run the image scraper
-asyncio.run(main())
+if __name__ == "__main__":
+    args = parse_args()
+    deadline = args.deadline * 60 if args.deadline else None
+    asyncio.run(reextract(args.rescan) if args.reextract else main(deadline=deadline, rescan=args.rescan))
@@ -0,0 +1,136 @@
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+TRACE_FILE = "trace.json"          # Open in chrome://tracing or https://ui.perfetto.dev
+PROFILE_FILE = "profile.folded"    # Collapsed stacks for flamegraph.pl / speedscope
+SAMPLE_INTERVAL = 0.005
+
+NULL_SPAN = contextlib.nullcontext()
+
+tracer = None    # Set by enable(); span()/record() are no-ops while it is None
+profiler = None
+
+
+def now():
+    return time.perf_counter()
+
+
+class Tracer:
+    """
+    Collects complete ("X") events in Chrome trace-event format.
+    Each asyncio task gets its own lane, so every worker shows as a row.
+    """
+
+    def __init__(self, path=TRACE_FILE):
+        self.path = path
+        self.origin = now()
+        self.pid = os.getpid()
+        self.events = []
+        self.lanes = {}
+
+    def _lane(self):
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:  # No running loop: a plain thread
+            task = None
+        key = id(task) if task else threading.get_ident()
+        if key not in self.lanes:
+            self.lanes[key] = len(self.lanes) + 1
+            name = task.get_name() if task else threading.current_thread().name
+            self.events.append({"name": "thread_name", "ph": "M", "pid": self.pid,
+                                "tid": self.lanes[key], "args": {"name": name}})
+        return self.lanes[key]
+
+    def add(self, name, begin, end, args):
+        self.events.append({
+            "name": name, "ph": "X", "pid": self.pid, "tid": self._lane(),
+            "ts": (begin - self.origin) * 1e6, "dur": (end - begin) * 1e6, "args": args,
+        })
+
+    @contextlib.contextmanager
+    def span(self, name, args):
+        begin = now()
+        try:
+            yield
+        finally:
+            self.add(name, begin, now(), args)
+
+    def export(self):
+        with open(self.path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+        print(f"🧵 Wrote {len(self.events)} trace events to {self.path}")
+
+
+class SamplingProfiler(threading.Thread):
+    """
+    Samples the event loop thread's Python stack and writes collapsed stacks.
+    """
+
+    def __init__(self, path=PROFILE_FILE, interval=SAMPLE_INTERVAL):
+        super().__init__(name="sampling-profiler", daemon=True)
+        self.path = path
+        self.interval = interval
+        self.target = threading.get_ident()
+        self.samples = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        with open(self.path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"🔥 Wrote {sum(self.samples.values())} profile samples to {self.path}")
+
+
+def span(name, **args):
+    """
+    Times a block as a trace span; returns a shared no-op context when tracing is off.
+    """
+    if tracer is None:
+        return NULL_SPAN
+    return tracer.span(name, args)
+
+
+def record(name, begin, **args):
+    """
+    Records a span that started at `begin` (from now()) and ends here,
+    for waits that begin and end in different places.
+    """
+    if tracer is not None and begin is not None:
+        tracer.add(name, begin, now(), args)
+
+
+def enable(trace_file=TRACE_FILE, profile_file=None):
+    global tracer, profiler
+    tracer = Tracer(trace_file)
+    if profile_file:
+        profiler = SamplingProfiler(profile_file)
+        profiler.start()
+
+
+def finish():
+    global tracer, profiler
+    if profiler is not None:
+        profiler.stop()
+        profiler = None
+    if tracer is not None:
+        tracer.export()
+        tracer = None